@@ -0,0 +1,152 @@
+"""Chat message storage engines, selected with CHAT_STORAGE.
+
+- "documents" (default): one document per message in `messages`.
+- "buckets": messages are appended to per-match bucket documents in
+  `message_buckets`, CHAT_BUCKET_SIZE messages each, numbered by a per-match
+  `seq` under a unique (match_id, seq) index. An append `$push`es into the
+  match's bucket that still has room, usually in one update. When it is
+  full, the next bucket is created as seq + 1 (rollover); if another
+  worker creates it first, the unique index rejects the second insert and
+  the append retries into the winner's bucket. So a match has at most one
+  open bucket, and buckets in seq order hold messages in time order.
+  A history page is then one or two bucket reads instead of one index
+  entry and document per message, and the index holds one entry per bucket.
+
+Both engines expose the same methods (`history` streams a whole conversation
+without loading it) and return messages as
+`{"_id", "match_id", "sender_id", "content", "created_at"}` dicts, oldest
+first. `manage.py migrate-messages` copies the documents layout into buckets.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+DEFAULT_BUCKET_SIZE = 100
+
+
+def naive_utc(value: datetime) -> datetime:
+    """pymongo returns naive UTC datetimes; compare like with like"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class DocumentStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        self.collection.create_index([("match_id", 1), ("created_at", -1)])
+
+    def append(self, message: dict) -> dict:
+        message.setdefault("_id", ObjectId())
+        self.collection.insert_one(message)
+        return message
+
+    def page(self, match_id: ObjectId, limit: Optional[int] = None, before: Optional[datetime] = None) -> list:
+        """Newest `limit` messages older than `before` (all when limit is None), oldest first"""
+        query = {"match_id": match_id}
+        if before is not None:
+            query["created_at"] = {"$lt": before}
+        if limit is None:
+            return list(self.collection.find(query).sort("created_at", 1))
+        return list(self.collection.find(query).sort("created_at", -1).limit(limit))[::-1]
+
+    def history(self, match_id: ObjectId, batch_size: int = 500):
+        """Every message of a match, oldest first, read lazily"""
+        return self.collection.find({"match_id": match_id}).sort("created_at", 1).batch_size(batch_size)
+
+    def last_messages(self, match_ids: list) -> dict:
+        return {
+            msg["_id"]: msg for msg in self.collection.aggregate([
+                {"$match": {"match_id": {"$in": match_ids}}},
+                {"$sort": {"match_id": 1, "created_at": -1}},
+                {"$group": {
+                    "_id": "$match_id",
+                    "content": {"$first": "$content"},
+                    "created_at": {"$first": "$created_at"},
+                    "sender_id": {"$first": "$sender_id"}
+                }}
+            ])
+        }
+
+
+class BucketStore:
+    def __init__(self, collection, bucket_size: int = DEFAULT_BUCKET_SIZE):
+        self.collection = collection
+        self.bucket_size = bucket_size
+
+    def ensure_indexes(self):
+        self.collection.create_index([("match_id", 1), ("seq", -1)], unique=True)
+
+    def append(self, message: dict) -> dict:
+        message.setdefault("_id", ObjectId())
+        entry = {k: message[k] for k in ("_id", "sender_id", "content", "created_at")}
+        push = {
+            "$push": {"messages": entry},
+            "$inc": {"count": 1},
+            "$min": {"first_at": message["created_at"]},
+            "$max": {"last_at": message["created_at"]},
+        }
+        match_id = message["match_id"]
+        # Only the newest bucket can have room
+        if self.collection.update_one({"match_id": match_id, "count": {"$lt": self.bucket_size}}, push).matched_count:
+            return message
+        while True:
+            newest = self.collection.find_one({"match_id": match_id}, {"seq": 1, "count": 1}, sort=[("seq", -1)])
+            if newest is None:
+                seq = 0
+            else:
+                seq = newest["seq"] if newest["count"] < self.bucket_size else newest["seq"] + 1
+            try:
+                self.collection.update_one(
+                    {"match_id": match_id, "seq": seq, "count": {"$lt": self.bucket_size}}, push, upsert=True
+                )
+                return message
+            except DuplicateKeyError:
+                # Bucket `seq` was created or filled concurrently: look again
+                continue
+
+    def page(self, match_id: ObjectId, limit: Optional[int] = None, before: Optional[datetime] = None) -> list:
+        query = {"match_id": match_id}
+        if before is not None:
+            before = naive_utc(before)
+            query["first_at"] = {"$lt": before}
+        # Newest buckets first; usually the first one or two cover a page
+        buckets = self.collection.find(query).sort("seq", -1).batch_size(2)
+        messages = []
+        for bucket in buckets:
+            messages.extend(
+                {**m, "match_id": match_id} for m in bucket["messages"]
+                if before is None or m["created_at"] < before
+            )
+            if limit is not None and len(messages) >= limit:
+                break
+        buckets.close()
+        messages.sort(key=lambda m: m["created_at"])
+        return messages[-limit:] if limit is not None else messages
+
+    def history(self, match_id: ObjectId, batch_size: int = 500):
+        buckets = self.collection.find({"match_id": match_id}).sort("seq", 1)
+        for bucket in buckets.batch_size(max(1, batch_size // self.bucket_size)):
+            for message in sorted(bucket["messages"], key=lambda m: m["created_at"]):
+                yield {**message, "match_id": match_id}
+
+    def last_messages(self, match_ids: list) -> dict:
+        return {
+            doc["_id"]: doc["last"] for doc in self.collection.aggregate([
+                {"$match": {"match_id": {"$in": match_ids}}},
+                {"$sort": {"match_id": 1, "seq": -1}},
+                {"$group": {"_id": "$match_id", "last": {"$first": {"$arrayElemAt": ["$messages", -1]}}}}
+            ])
+        }
+
+
+def make_store(db, engine: str, bucket_size: int = DEFAULT_BUCKET_SIZE):
+    if engine == "documents":
+        return DocumentStore(db["messages"])
+    if engine == "buckets":
+        return BucketStore(db["message_buckets"], bucket_size)
+    raise ValueError(f"Unknown chat storage {engine!r}")
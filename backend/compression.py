@@ -0,0 +1,134 @@
+"""Response compression: brotli or gzip, above a size threshold.
+
+The encoding is negotiated from Accept-Encoding, honouring q-values (q=0
+refuses an encoding; brotli wins ties when the `brotli` package is
+installed). Complete responses smaller than
+`minimum_size` are sent as-is: below roughly a kilobyte the CPU cost isn't
+worth the bytes saved. Streaming responses are compressed chunk by chunk and
+flushed after each one, so clients keep receiving data as it is produced.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional native wheel: fall back to gzip only
+    brotli = None
+
+SKIP_CONTENT_TYPES = (b"text/event-stream", b"image/", b"application/zip", b"application/gzip")
+
+
+def _qualities(accepted: str) -> dict:
+    """{"gzip": 1.0, "br": 0.0, ...} from an Accept-Encoding value"""
+    qualities = {}
+    for part in accepted.split(","):
+        coding, *params = (p.strip() for p in part.split(";"))
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding] = q
+    return qualities
+
+
+def negotiate(headers: list) -> str:
+    accepted = ""
+    for name, value in headers:
+        if name == b"accept-encoding":
+            accepted = value.decode("latin-1").lower()
+            break
+    qualities = _qualities(accepted)
+    wildcard = qualities.get("*", 0.0)
+    # Highest q wins, brotli on ties; q=0 means "not acceptable"
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = max(offered, key=lambda coding: qualities.get(coding, wildcard))
+    return best if qualities.get(best, wildcard) > 0 else ""
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._impl = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._impl = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._impl.process(data) + self._impl.flush()
+        return self._impl.compress(data) + self._impl.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._impl.process(data) + self._impl.finish()
+        return self._impl.compress(data) + self._impl.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        encoding = negotiate(scope["headers"]) if scope["type"] == "http" else ""
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk tells us the size
+                start = message
+                headers = dict(start["headers"])
+                passthrough = (
+                    b"content-encoding" in headers
+                    or headers.get(b"content-type", b"").startswith(SKIP_CONTENT_TYPES)
+                )
+                if passthrough:
+                    await send(start)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers = [(k, v) for k, v in start["headers"] if k not in (b"content-length", b"vary")]
+                vary = dict(start["headers"]).get(b"vary")
+                headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+                ]
+                if not more_body:
+                    body = compressor.finish(body)
+                    headers.append((b"content-length", str(len(body)).encode()))
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": body if not more_body else compressor.chunk(body),
+                            "more_body": more_body})
+                return
+            body = compressor.chunk(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,59 @@
+"""Streaming NDJSON export of a rider's data (GET /api/export).
+
+Records are produced by async generators over MongoDB cursors: documents
+are pulled `batch_size` at a time in a worker thread (pymongo is
+synchronous), serialized, and written out in chunks of about `chunk_size`
+bytes. Memory stays flat whatever the size of the history: at most one
+cursor batch and one output chunk are held at a time. Chunks rather than
+single lines keep the number of ASGI sends, and the compression flushes,
+proportional to the bytes sent.
+
+The first record is sent on its own, so the response starts (and the
+client sees progress) before any export query has to run.
+"""
+import asyncio
+import itertools
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable
+
+from bson import ObjectId
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _take(iterator, count: int) -> list:
+    return list(itertools.islice(iterator, count))
+
+
+async def iterate(documents: Iterable, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[dict]:
+    """Async iteration over a pymongo cursor (or any iterator), one batch per worker-thread call"""
+    if hasattr(documents, "batch_size"):
+        documents.batch_size(batch_size)
+    iterator = iter(documents)
+    while batch := await asyncio.to_thread(_take, iterator, batch_size):
+        for document in batch:
+            yield document
+
+
+async def ndjson(records: AsyncIterator[dict], chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    first = True
+    async for record in records:
+        buffer += json.dumps(record, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+        buffer += b"\n"
+        if first or len(buffer) >= chunk_size:
+            first = False
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
@@ -0,0 +1,76 @@
+"""Sparse fieldsets: `?fields=id,name,profile_picture`.
+
+Each listing declares the response fields it can return and the document
+fields each one is built from. The requested set is validated (unknown names
+are a 400), turned into a MongoDB projection so unrequested fields, such as
+route waypoints, never leave the database, and applied to the serialized
+dicts. One level of nesting is supported with dotted names
+(`fields=id,user.name`). Without `fields` everything is returned, as before.
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+def identity(*names: str) -> dict:
+    return {name: [name] for name in names}
+
+
+USER_FIELDS = {
+    "id": [],
+    **identity("email", "name", "bio", "experience_level", "avg_distance", "preferred_zone", "location", "age",
+               "profile_completed", "created_at"),
+    "profile_picture": ["profile_picture", "profile_picture_variants"],
+}
+DISCOVER_FIELDS = {**USER_FIELDS, "distance_km": ["geo"], "compatibility": []}
+ROUTE_FIELDS = {
+    "id": [],
+    **identity("title", "description", "distance", "elevation", "difficulty", "start_point", "end_point",
+               "waypoints", "tags", "user_id", "user_name", "likes", "stats", "duplicate_of", "duplicates",
+               "created_at"),
+    "image_url": ["image_url", "image_variants"],
+}
+SEARCH_ROUTE_FIELDS = {**ROUTE_FIELDS, "score": []}
+MATCH_FIELDS = {"id": [], "user": ["users"], "last_message": [], "created_at": ["created_at"]}
+MATCH_NESTED = {"user": USER_FIELDS}
+NOTIFICATION_FIELDS = {"id": [], **identity("type", "title", "body", "data", "read", "created_at")}
+
+
+class FieldSet:
+    def __init__(self, spec: Optional[str], available: dict, nested: dict = None):
+        self.available = available
+        self.names = None
+        self.nested = {}
+        if not spec:
+            return
+        self.names = {"id"}
+        for name in filter(None, (part.strip() for part in spec.split(","))):
+            parent, _, child = name.partition(".")
+            if parent not in available or (child and child not in (nested or {}).get(parent, {})):
+                raise HTTPException(status_code=400, detail=f"Unknown field '{name}'")
+            self.names.add(parent)
+            if child:
+                self.nested.setdefault(parent, FieldSet(None, nested[parent])).add(child)
+
+    def add(self, name: str):
+        self.names = (self.names or {"id"}) | {name}
+
+    def __contains__(self, name: str) -> bool:
+        return self.names is None or name in self.names
+
+    def child(self, parent: str) -> "FieldSet":
+        """Fields requested inside a nested object (all of them when not narrowed)"""
+        return self.nested.get(parent) or FieldSet(None, {})
+
+    def projection(self, *required: str) -> Optional[dict]:
+        """MongoDB projection for the requested fields plus `required`; None for whole documents"""
+        if self.names is None:
+            return None
+        projection = {"_id": 1, **{field: 1 for name in self.names for field in self.available[name]}}
+        projection.update({field: 1 for field in required})
+        return projection
+
+    def apply(self, data: dict) -> dict:
+        if self.names is None:
+            return data
+        return {key: value for key, value in data.items() if key in self.names}
@@ -0,0 +1,94 @@
+"""Near-duplicate route detection.
+
+A route's fingerprint is the MinHash signature of the set of grid cells its
+track passes through (the track is resampled every SAMPLE_STEP_M so sparse
+waypoints still visit every cell in between). Two uploads of the same loop,
+in either direction and with different GPS noise, share most cells, and the
+fraction of equal signature slots estimates that overlap (Jaccard).
+
+For lookup the signature is split into BANDS bands of ROWS slots, each hashed
+to one integer key stored in a multikey index: routes sharing at least one
+band key are the only candidates, so an insert examines a handful of routes
+instead of the whole collection.
+"""
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+import geo
+
+CELL_DEG = 0.0025  # ~280 m north-south
+SAMPLE_STEP_M = 100.0
+MIN_CELLS = 5
+BANDS = 16
+ROWS = 4
+PRIME = (1 << 31) - 1
+# Routes at least this similar are duplicates
+DUPLICATE_THRESHOLD = 0.6
+MAX_CANDIDATES = 50
+
+# Fixed seed: signatures must agree across processes and deploys
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(1, PRIME, BANDS * ROWS, dtype=np.int64)
+_B = _rng.integers(0, PRIME, BANDS * ROWS, dtype=np.int64)
+
+
+def cells(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Distinct grid cell ids visited by the track"""
+    segments_m = geo.haversine_km(lat[:-1], lng[:-1], lat[1:], lng[1:]) * 1000
+    along_m = np.concatenate(([0.0], np.cumsum(segments_m)))
+    stations = np.append(np.arange(0.0, along_m[-1], SAMPLE_STEP_M), along_m[-1])
+    rows = np.floor((np.interp(stations, along_m, lat) + 90) / CELL_DEG).astype(np.int64)
+    cols = np.floor((np.interp(stations, along_m, lng) + 180) / CELL_DEG).astype(np.int64)
+    return np.unique((rows << 18) | cols)
+
+
+def signature(cell_ids: np.ndarray) -> np.ndarray:
+    """MinHash: for each hash function, the minimum over the cells"""
+    hashed = (_A[:, None] * (cell_ids[None, :] % PRIME) + _B[:, None]) % PRIME
+    return hashed.min(axis=1)
+
+
+def band_keys(minhash: np.ndarray) -> list:
+    keys = []
+    for band, rows in enumerate(minhash.reshape(BANDS, ROWS)):
+        key = 0
+        for value in rows:
+            key = (key * 1000003 + int(value)) % PRIME
+        keys.append((band << 32) | key)
+    return keys
+
+
+def compute(lat: np.ndarray, lng: np.ndarray) -> Optional[dict]:
+    """{"minhash", "bands"} for a track, or None when it is too short to compare"""
+    if len(lat) < 2:
+        return None
+    cell_ids = cells(lat, lng)
+    if len(cell_ids) < MIN_CELLS:
+        return None
+    minhash = signature(cell_ids)
+    return {"minhash": minhash.tolist(), "bands": band_keys(minhash)}
+
+
+def similarity(a: list, b: list) -> float:
+    return float(np.mean(np.asarray(a) == np.asarray(b)))
+
+
+def find_duplicate(collection, fingerprint: dict, exclude_id=None, before: Optional[datetime] = None) -> Optional[tuple]:
+    """(canonical route id, similarity) of the closest earlier upload, if it is a duplicate
+
+    `before` is the route's own upload time: only routes created earlier can be its original.
+    """
+    query = {"fingerprint.bands": {"$in": fingerprint["bands"]}}
+    if exclude_id is not None:
+        query["_id"] = {"$ne": exclude_id}
+    if before is not None:
+        query["created_at"] = {"$lt": before}
+    candidates = collection.find(query, {"fingerprint.minhash": 1, "duplicate_of": 1}).limit(MAX_CANDIDATES)
+    best = None
+    for candidate in candidates:
+        score = similarity(fingerprint["minhash"], candidate["fingerprint"]["minhash"])
+        if score >= DUPLICATE_THRESHOLD and (best is None or score > best[1]):
+            best = (candidate.get("duplicate_of") or candidate["_id"], score)
+    return best
@@ -0,0 +1,85 @@
+"""Rider locations: offline gazetteer, GeoJSON points and distances.
+
+Profiles carry free-text `location` / `preferred_zone` values. The gazetteer maps
+known Italian regions, cities and gravel areas (spelling-insensitive) to
+coordinates so they can be stored as GeoJSON points and queried through a
+2dsphere index, without calling an external geocoding service.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+# Radius MongoDB uses for $centerSphere radians
+EARTH_RADIUS_KM = 6378.1
+
+# (lat, lng) of regions, main cities and well-known gravel areas
+GAZETTEER = {
+    # Regions
+    "toscana": (43.35, 11.10), "lombardia": (45.60, 9.80), "veneto": (45.65, 11.85),
+    "emilia romagna": (44.50, 11.00), "piemonte": (45.05, 7.90), "lazio": (41.90, 12.70),
+    "trentino": (46.10, 11.10), "trentino alto adige": (46.40, 11.30), "alto adige": (46.65, 11.40),
+    "sudtirol": (46.65, 11.40), "sardegna": (40.05, 9.00), "sicilia": (37.55, 14.15),
+    "liguria": (44.30, 8.70), "umbria": (42.95, 12.50), "marche": (43.35, 13.15),
+    "abruzzo": (42.20, 13.85), "molise": (41.65, 14.60), "campania": (40.85, 14.80),
+    "puglia": (41.00, 16.60), "basilicata": (40.50, 16.10), "calabria": (39.05, 16.50),
+    "friuli venezia giulia": (46.10, 13.10), "friuli": (46.10, 13.10), "valle d aosta": (45.75, 7.40),
+    # Cities
+    "roma": (41.90, 12.50), "milano": (45.46, 9.19), "torino": (45.07, 7.69), "firenze": (43.77, 11.26),
+    "bologna": (44.49, 11.34), "napoli": (40.85, 14.27), "venezia": (45.44, 12.32), "verona": (45.44, 10.99),
+    "padova": (45.41, 11.88), "treviso": (45.67, 12.24), "vicenza": (45.55, 11.55), "trento": (46.07, 11.12),
+    "bolzano": (46.50, 11.35), "genova": (44.41, 8.93), "siena": (43.32, 11.33), "pisa": (43.72, 10.40),
+    "lucca": (43.84, 10.50), "arezzo": (43.46, 11.88), "grosseto": (42.76, 11.11), "perugia": (43.11, 12.39),
+    "ancona": (43.62, 13.52), "bergamo": (45.70, 9.67), "brescia": (45.54, 10.22), "como": (45.81, 9.09),
+    "modena": (44.65, 10.93), "parma": (44.80, 10.33), "reggio emilia": (44.70, 10.63),
+    "ravenna": (44.42, 12.20), "rimini": (44.06, 12.57), "udine": (46.06, 13.24), "trieste": (45.65, 13.78),
+    "cuneo": (44.38, 7.54), "asti": (44.90, 8.21), "bari": (41.12, 16.87), "lecce": (40.35, 18.17),
+    "palermo": (38.12, 13.36), "catania": (37.50, 15.09), "cagliari": (39.22, 9.12), "sassari": (40.73, 8.56),
+    "pescara": (42.46, 14.21), "l aquila": (42.35, 13.40),
+    # Gravel areas
+    "chianti": (43.50, 11.30), "crete senesi": (43.20, 11.55), "val d orcia": (43.03, 11.60),
+    "maremma": (42.70, 11.20), "garfagnana": (44.10, 10.40), "langhe": (44.60, 8.05),
+    "roero": (44.80, 7.95), "monferrato": (45.00, 8.30), "franciacorta": (45.60, 10.00),
+    "oltrepo pavese": (44.90, 9.20), "colli euganei": (45.30, 11.70), "colli berici": (45.45, 11.55),
+    "prosecco": (45.90, 12.10), "valpolicella": (45.53, 10.90), "lago di garda": (45.60, 10.65),
+    "dolomiti": (46.45, 11.85), "appennino": (44.20, 10.90), "montefeltro": (43.80, 12.40),
+    "etna": (37.75, 15.00), "gallura": (40.95, 9.30), "murge": (40.85, 16.50), "cilento": (40.25, 15.20),
+}
+
+
+@lru_cache(maxsize=4096)
+def normalize(name: str) -> str:
+    """Lowercase, strip accents and punctuation: "Valle d'Aosta" -> "valle d aosta\""""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def point(lat: float, lng: float) -> dict:
+    return {"type": "Point", "coordinates": [float(lng), float(lat)]}
+
+
+def geocode(name: Optional[str]) -> Optional[dict]:
+    """GeoJSON point for a known place name; tries the whole text then each comma-separated part"""
+    if not name:
+        return None
+    for candidate in [name, *name.split(",")]:
+        coords = GAZETTEER.get(normalize(candidate))
+        if coords:
+            return point(*coords)
+    return None
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance; accepts scalars or NumPy arrays"""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def distance_km(a: Optional[dict], b: Optional[dict]) -> Optional[float]:
+    if not a or not b:
+        return None
+    (lng1, lat1), (lng2, lat2) = a["coordinates"], b["coordinates"]
+    return float(haversine_km(lat1, lng1, lat2, lng2))
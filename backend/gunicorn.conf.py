@@ -0,0 +1,45 @@
+"""Production serving: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py server:app
+
+WEB_CONCURRENCY worker processes (default: one per CPU, at most 4) share
+the port.
+With PRELOAD_APP the app is imported once in the master and forked, so
+workers start faster and share the imported code. MongoDB connections are
+only opened after the fork (the client is created with connect=False).
+On SIGTERM each worker drains for DRAIN_SECONDS (readiness fails, requests
+are still served), then finishes in-flight requests within
+GRACEFUL_TIMEOUT before being killed.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8001')}"
+# Capped by default: small instances often report the host's CPU count
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count(), 4)))
+worker_class = "serving.DrainingUvicornWorker"
+preload_app = os.environ.get("PRELOAD_APP", "true").lower() == "true"
+graceful_timeout = int(float(os.environ.get("DRAIN_SECONDS", "0"))) + int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+keepalive = int(os.environ.get("KEEPALIVE", "5"))
+accesslog = None
+
+# Prometheus: with several processes each worker writes its samples to a shared
+# directory and /metrics aggregates them (see metrics.metrics_response)
+metrics_dir = None
+if workers > 1 and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="gravelmatch-metrics-")
+
+
+def on_exit(server):
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
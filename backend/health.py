@@ -0,0 +1,53 @@
+"""Readiness probe behind GET /api/health.
+
+A worker is ready when MongoDB answers a ping and it is not draining. The
+ping result is cached for `ttl` seconds and concurrent probes share the
+ping in flight, so frequent load balancer / orchestrator checks cost at
+most one round trip per worker per `ttl`. A ping slower than `timeout`
+counts as a failure instead of holding the probe.
+
+DRAINING is set on SIGTERM by serving.DrainingServer: the probe then fails
+while requests keep being served, so load balancers stop routing new
+traffic to the worker before it closes its connections.
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Optional
+
+DRAINING = threading.Event()
+
+
+class Readiness:
+    def __init__(self, ping: Callable[[], object], ttl: float = 5.0, timeout: float = 2.0):
+        self.ping = ping
+        self.ttl = ttl
+        self.timeout = timeout
+        self.result: Optional[dict] = None
+        self.checked_at = 0.0
+        self._pending: Optional[asyncio.Future] = None
+
+    async def check(self) -> dict:
+        if self.result is None or time.monotonic() - self.checked_at >= self.ttl:
+            if self._pending is None:
+                self._pending = asyncio.ensure_future(self._ping())
+            await asyncio.shield(self._pending)
+        draining = DRAINING.is_set()
+        return {
+            "ready": self.result["ok"] and not draining,
+            "draining": draining,
+            "mongo": {**self.result, "age_s": round(time.monotonic() - self.checked_at, 2)},
+        }
+
+    async def _ping(self):
+        started = time.perf_counter()
+        try:
+            # The ping thread may outlive a timeout: it ends at serverSelectionTimeoutMS
+            await asyncio.wait_for(asyncio.to_thread(self.ping), self.timeout)
+            result = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+        except Exception as e:
+            # Server selection errors embed the whole topology description
+            result = {"ok": False, "error": f"{type(e).__name__}: {e}"[:200]}
+        self.result = result
+        self.checked_at = time.monotonic()
+        self._pending = None
@@ -0,0 +1,118 @@
+"""Responsive image variants for profile and route pictures.
+
+Every upload is rendered once into three variants, recorded on the user or
+route document next to the legacy single URL:
+
+- thumb: avatars in match and chat lists, route list icons
+- card: discover cards and route lists
+- full: profile and route detail views (the legacy URL)
+
+Serializers pick the variant for their view with `pick`, falling back to the
+legacy URL for documents uploaded before variants existed.
+
+Two backends, selected with IMAGE_BACKEND:
+
+- "cloudinary" (default): one upload with an eager transformation per
+  variant, so all of them are generated at upload time instead of on the
+  first request from a client.
+- "local": Pillow renders WebP files into IMAGE_LOCAL_DIR, served by the
+  backend under IMAGE_LOCAL_URL. Needs no external service (development,
+  tests, benchmarks). Face gravity is not available: crops are centred.
+"""
+import io
+import os
+import uuid
+
+PROFILE_VARIANTS = {
+    "thumb": {"width": 160, "height": 160, "crop": "fill", "gravity": "face"},
+    "card": {"width": 400, "height": 400, "crop": "fill", "gravity": "face"},
+    "full": {"width": 800, "height": 800, "crop": "fill", "gravity": "face"},
+}
+ROUTE_VARIANTS = {
+    "thumb": {"width": 240, "height": 160, "crop": "fill"},
+    "card": {"width": 640, "height": 400, "crop": "fill"},
+    "full": {"width": 1200, "height": 1200, "crop": "limit"},
+}
+
+
+def pick(variants: dict, fallback: str, size: str) -> str:
+    """URL of the `size` variant, or the legacy single URL"""
+    return (variants or {}).get(size) or fallback
+
+
+class CloudinaryStore:
+    def __init__(self, get_uploader, quality: str = "auto:good"):
+        # The SDK is imported on first use, see server.get_cloudinary_uploader
+        self.get_uploader = get_uploader
+        self.quality = quality
+
+    def store(self, data: bytes, folder: str, variants: dict) -> dict:
+        result = self.get_uploader().upload(
+            data,
+            folder=folder,
+            resource_type="image",
+            # The original is only a source for the variants: cap what is kept
+            transformation=[{"width": 2400, "height": 2400, "crop": "limit"}],
+            eager=[{**spec, "quality": self.quality} for spec in variants.values()],
+        )
+        # Eager results come back in request order
+        return {
+            "public_id": result["public_id"],
+            "width": result.get("width"),
+            "height": result.get("height"),
+            "variants": {name: eager["secure_url"] for name, eager in zip(variants, result["eager"])},
+        }
+
+
+class LocalStore:
+    def __init__(self, directory: str, base_url: str, quality: int = 80):
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+        self.quality = quality
+
+    def render(self, data: bytes, variants: dict) -> tuple:
+        """({name: (webp bytes, width, height)}, source size)"""
+        from PIL import Image, ImageOps
+
+        rendered = {}
+        with Image.open(io.BytesIO(data)) as source:
+            size = source.size
+            # JPEGs are decoded straight at a reduced scale that still covers the largest variant
+            largest = max(max(spec["width"], spec["height"]) for spec in variants.values())
+            source.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(source).convert("RGB")
+        if (image.width > image.height) != (size[0] > size[1]):
+            size = size[::-1]
+        for name, spec in variants.items():
+            box = (spec["width"], spec["height"])
+            if spec["crop"] == "fill":
+                variant = ImageOps.fit(image, box, Image.Resampling.LANCZOS)
+            else:
+                variant = image.copy()
+                variant.thumbnail(box, Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, "WEBP", quality=self.quality, method=4)
+            rendered[name] = (buffer.getvalue(), variant.width, variant.height)
+        return rendered, size
+
+    def store(self, data: bytes, folder: str, variants: dict) -> dict:
+        rendered, (width, height) = self.render(data, variants)
+        # `folder` comes from the client: keep it inside the upload directory
+        folder = "/".join(part for part in folder.split("/") if part not in ("", ".", ".."))
+        public_id = f"{folder}/{uuid.uuid4().hex}" if folder else uuid.uuid4().hex
+        os.makedirs(os.path.join(self.directory, os.path.dirname(public_id)), exist_ok=True)
+        urls = {}
+        for name in variants:
+            path = f"{public_id}_{name}.webp"
+            with open(os.path.join(self.directory, path), "wb") as f:
+                f.write(rendered[name][0])
+            urls[name] = f"{self.base_url}/{path}"
+        return {"public_id": public_id, "width": width, "height": height, "variants": urls}
+
+
+def make_store(backend: str, get_uploader=None, directory: str = "uploads", base_url: str = "/uploads"):
+    if backend == "cloudinary":
+        return CloudinaryStore(get_uploader)
+    if backend == "local":
+        return LocalStore(directory, base_url)
+    raise ValueError(f"Unknown image backend {backend!r}")
@@ -0,0 +1,203 @@
+"""Maintenance commands run against the configured database.
+
+    python manage.py ensure-indexes
+    python manage.py backfill-geo [--batch-size 1000]
+    python manage.py backfill-admirers [--batch-size 1000]
+    python manage.py backfill-route-stats [--batch-size 1000]
+    python manage.py backfill-fingerprints
+    python manage.py migrate-messages [--bucket-size 100] [--drop]
+"""
+import argparse
+
+from pymongo import UpdateOne
+
+import chat
+import fingerprints
+import geo
+import server
+import tracks
+
+
+def ensure_indexes(args):
+    server.ensure_indexes()
+    print("Indexes created")
+
+
+def backfill_geo(args):
+    """Geocode users that have no GeoJSON point yet and store the normalized zone_key"""
+    cursor = server.users_collection.find(
+        {"$or": [
+            {"geo": {"$exists": False}},
+            {"zone_key": {"$exists": False}, "preferred_zone": {"$type": "string"}},
+        ]},
+        {"location": 1, "preferred_zone": 1, "geo": 1}
+    ).batch_size(args.batch_size)
+    updates, scanned, located = [], 0, 0
+    for user in cursor:
+        scanned += 1
+        fields = {}
+        if user.get("preferred_zone"):
+            fields["zone_key"] = geo.normalize(user["preferred_zone"])
+        point = None if user.get("geo") else geo.geocode(user.get("location")) or geo.geocode(user.get("preferred_zone"))
+        if point:
+            located += 1
+            fields.update({"geo": point, "geo_source": "gazetteer"})
+        if fields:
+            updates.append(UpdateOne({"_id": user["_id"]}, {"$set": fields}))
+        if len(updates) >= args.batch_size:
+            server.users_collection.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        server.users_collection.bulk_write(updates, ordered=False)
+    print(f"Scanned {scanned} users, located {located}")
+
+
+def backfill_admirers(args):
+    """Rebuild each user's inbound-like index from likes the user has not answered yet"""
+    pending = server.swipes_collection.aggregate([
+        {"$match": {"action": "like"}},
+        # Any swipe back from the target answers the like (uses the user_id/target_user_id index)
+        {"$lookup": {
+            "from": server.swipes_collection.name,
+            "localField": "target_user_id",
+            "foreignField": "user_id",
+            "let": {"liker": "$user_id"},
+            "pipeline": [{"$match": {"$expr": {"$eq": ["$target_user_id", "$$liker"]}}}, {"$limit": 1}],
+            "as": "answer"
+        }},
+        {"$match": {"answer": {"$size": 0}}},
+        {"$sort": {"created_at": 1}},
+        {"$group": {"_id": "$target_user_id", "likers": {"$push": "$user_id"}}},
+    ], allowDiskUse=True)
+    updates, users = [], 0
+    for doc in pending:
+        users += 1
+        # Most recent distinct likers, kept oldest first like the live index
+        seen, admirers = set(), []
+        for liker in reversed(doc["likers"]):
+            if liker not in seen:
+                seen.add(liker)
+                admirers.append(liker)
+        admirers = admirers[:server.ADMIRERS_MAX][::-1]
+        updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"admirers": admirers}}))
+        if len(updates) >= args.batch_size:
+            server.users_collection.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        server.users_collection.bulk_write(updates, ordered=False)
+    print(f"Indexed pending admirers for {users} users")
+
+
+def backfill_route_stats(args):
+    """Compute track statistics for routes created before they were derived at creation"""
+    cursor = server.routes_collection.find(
+        {"stats": {"$exists": False}}, {"waypoints": 1}
+    ).batch_size(args.batch_size)
+    updates, scanned, computed = [], 0, 0
+    for route in cursor:
+        scanned += 1
+        stats = tracks.summarize(route.get("waypoints"))
+        # Client-supplied distance / elevation are kept: only new routes are overridden
+        updates.append(UpdateOne({"_id": route["_id"]}, {"$set": {"stats": stats}}))
+        computed += stats is not None
+        if len(updates) >= args.batch_size:
+            server.routes_collection.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        server.routes_collection.bulk_write(updates, ordered=False)
+    print(f"Scanned {scanned} routes, computed stats for {computed}")
+
+
+def backfill_fingerprints(args):
+    """Fingerprint routes oldest first, linking each to an earlier upload of the same loop"""
+    routes = server.routes_collection
+    cursor = routes.find({"fingerprint": {"$exists": False}}, {"waypoints": 1, "created_at": 1}).sort("created_at", 1)
+    scanned, linked = 0, 0
+    for route in cursor:
+        scanned += 1
+        track = tracks.Track.from_waypoints(route.get("waypoints"))
+        fingerprint = fingerprints.compute(track.lat, track.lng)
+        # One write per route: the next lookup must see this fingerprint
+        # Routes uploaded since the deploy are already fingerprinted: never link to a later one
+        duplicate = fingerprints.find_duplicate(
+            routes, fingerprint, exclude_id=route["_id"], before=route.get("created_at")
+        ) if fingerprint else None
+        routes.update_one({"_id": route["_id"]}, {"$set": {
+            "fingerprint": fingerprint, "duplicate_of": duplicate[0] if duplicate else None
+        }})
+        if duplicate:
+            linked += 1
+            routes.update_one({"_id": duplicate[0]}, {"$inc": {"duplicates": 1}})
+    print(f"Scanned {scanned} routes, linked {linked} duplicates")
+
+
+def migrate_messages(args):
+    """Copy per-message documents into per-match buckets; `messages` is left untouched"""
+    store = chat.BucketStore(server.db["message_buckets"], args.bucket_size)
+    if args.drop:
+        store.collection.drop()
+    elif store.collection.estimated_document_count():
+        raise SystemExit("message_buckets is not empty: pass --drop to rebuild it")
+
+    # Walks the (match_id, created_at) index backwards: matches descending, messages ascending
+    cursor = server.messages_collection.find().sort([("match_id", -1), ("created_at", 1)]).batch_size(args.batch_size)
+    buckets, pending, migrated = [], [], 0
+    seq = 0
+
+    def close_bucket():
+        buckets.append({
+            "match_id": pending[0]["match_id"],
+            "seq": seq,
+            "count": len(pending),
+            "first_at": pending[0]["created_at"],
+            "last_at": pending[-1]["created_at"],
+            "messages": [{k: m[k] for k in ("_id", "sender_id", "content", "created_at")} for m in pending],
+        })
+        pending.clear()
+
+    for message in cursor:
+        if pending and message["match_id"] != pending[0]["match_id"]:
+            close_bucket()
+            seq = 0
+        elif len(pending) >= args.bucket_size:
+            close_bucket()
+            seq += 1
+        pending.append(message)
+        migrated += 1
+        if len(buckets) >= args.batch_size:
+            store.collection.insert_many(buckets, ordered=False)
+            buckets.clear()
+    if pending:
+        close_bucket()
+    if buckets:
+        store.collection.insert_many(buckets, ordered=False)
+    store.ensure_indexes()
+    print(f"Migrated {migrated} messages into {store.collection.estimated_document_count()} buckets; "
+          f"set CHAT_STORAGE=buckets to serve from them")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("ensure-indexes").set_defaults(func=ensure_indexes)
+    backfill = sub.add_parser("backfill-geo")
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    backfill.set_defaults(func=backfill_geo)
+    admirers = sub.add_parser("backfill-admirers")
+    admirers.add_argument("--batch-size", type=int, default=1000)
+    admirers.set_defaults(func=backfill_admirers)
+    route_stats = sub.add_parser("backfill-route-stats")
+    route_stats.add_argument("--batch-size", type=int, default=1000)
+    route_stats.set_defaults(func=backfill_route_stats)
+    sub.add_parser("backfill-fingerprints").set_defaults(func=backfill_fingerprints)
+    migrate = sub.add_parser("migrate-messages")
+    migrate.add_argument("--bucket-size", type=int, default=chat.DEFAULT_BUCKET_SIZE)
+    migrate.add_argument("--batch-size", type=int, default=1000)
+    migrate.add_argument("--drop", action="store_true", help="rebuild message_buckets from scratch")
+    migrate.set_defaults(func=migrate_messages)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
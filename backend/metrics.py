@@ -0,0 +1,142 @@
+"""Prometheus instrumentation: HTTP requests, event loop lag and MongoDB commands.
+
+Under gunicorn with several workers PROMETHEUS_MULTIPROC_DIR is set (see
+gunicorn.conf.py): each worker writes its samples there and /metrics
+aggregates all of them, whichever worker serves the scrape.
+"""
+import asyncio
+import os
+import time
+
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from pymongo import monitoring
+
+REQUEST_LATENCY = Histogram(
+    "gravelmatch_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "gravelmatch_http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum"
+)
+EVENT_LOOP_LAG = Histogram(
+    "gravelmatch_event_loop_lag_seconds",
+    "Delay between a scheduled event loop wake-up and the actual one",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "gravelmatch_mongo_command_duration_seconds",
+    "MongoDB command round-trip time",
+    ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "gravelmatch_mongo_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["collection", "command"]
+)
+RATE_LIMITED = Counter(
+    "gravelmatch_rate_limited_total",
+    "Requests rejected with 429 by the per-user rate limiter",
+    ["endpoint_class"]
+)
+MATCH_TIPS_BACKLOG = Gauge(
+    "gravelmatch_match_tips_backlog",
+    "Matches waiting for background AI tips generation",
+    multiprocess_mode="livesum"
+)
+
+
+# Scrapes and liveness probes: frequent, trivial and not user traffic, so left unmeasured
+UNINSTRUMENTED_PATHS = frozenset({"/metrics", "/api/health/live"})
+
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware, cheaper than BaseHTTPMiddleware on the hot path"""
+
+    def __init__(self, app):
+        self.app = app
+        # Labelled children are cached: .labels() takes a lock on every call
+        self._in_flight = {}
+        self._latency = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in UNINSTRUMENTED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = self._in_flight.get(method)
+        if in_flight is None:
+            in_flight = self._in_flight[method] = REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            # The router stores the matched route in the scope; label by its template
+            # so path parameters don't explode the label cardinality
+            route = scope.get("route")
+            key = (method, route.path if route else "unmatched", status_code)
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = REQUEST_LATENCY.labels(key[0], key[1], str(status_code))
+            latency.observe(time.perf_counter() - started)
+
+
+def command_collection(event: monitoring.CommandStartedEvent) -> str:
+    target = event.command.get(event.command_name)
+    if isinstance(target, str):
+        return target
+    if event.command_name == "getMore":
+        return event.command.get("collection", "none")
+    return "none"
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command issued through the client it is registered on"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        self._collections[(event.connection_id, event.request_id)] = command_collection(event)
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "none")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "none")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+
+def metrics_response() -> Response:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
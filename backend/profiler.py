@@ -0,0 +1,126 @@
+"""Opt-in sampling profiler for live workers.
+
+A fraction of requests (PROFILER_SAMPLE_RATE, or any request carrying the
+X-Debug-Profile header) is profiled: while one is in flight a background thread
+samples the event loop thread's stack every PROFILER_INTERVAL_MS. A sample is
+attributed to a request when that request's middleware frame is on the stack,
+i.e. when its task is the one running, so concurrent requests don't pollute each
+other's profiles. Stacks are aggregated per endpoint in the collapsed format used
+by flamegraph.pl / speedscope / inferno.
+
+When PROFILER_ENABLED is false the middleware is not installed at all.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+PROFILE_HEADER = b"x-debug-profile"
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def endpoint_label(scope: dict) -> str:
+    route = scope.get("route")
+    return f"{scope['method']} {route.path if route else scope['path']}"
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms: float = 5.0, max_depth: int = 128):
+        self.interval = interval_ms / 1000
+        self.max_depth = max_depth
+        self.stacks = defaultdict(Counter)
+        self.requests = Counter()
+        self._sampled = {}
+        self._loop_thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def begin(self, frame, scope: dict):
+        """Register the middleware frame of a sampled request"""
+        self._loop_thread = threading.get_ident()
+        self._sampled[id(frame)] = scope
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def end(self, frame, scope: dict):
+        self._sampled.pop(id(frame), None)
+        with self._lock:
+            self.requests[endpoint_label(scope)] += 1
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            if not self._sampled:
+                self._wake.wait()
+            time.sleep(self.interval)
+            self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            scope = self._sampled.get(id(frame))
+            if scope is not None:
+                # Root the stack at the endpoint; frames above the middleware are event loop plumbing
+                stack.reverse()
+                with self._lock:
+                    self.stacks[endpoint_label(scope)][";".join(stack)] += 1
+                return
+            stack.append(frame_label(frame))
+            frame = frame.f_back
+
+    def collapsed(self, endpoint: str = None) -> str:
+        """Flamegraph-compatible collapsed stacks, one `frame;frame;... count` per line"""
+        lines = []
+        with self._lock:
+            for name, stacks in sorted(self.stacks.items()):
+                if endpoint and name != endpoint:
+                    continue
+                for stack, count in stacks.most_common():
+                    lines.append(f"{name};{stack} {count}" if stack else f"{name} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                name: {"requests": self.requests[name], "samples": sum(self.stacks[name].values())}
+                for name in sorted(set(self.requests) | set(self.stacks))
+            }
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.requests.clear()
+
+
+class ProfilerMiddleware:
+    def __init__(self, app, profiler: SamplingProfiler, sample_rate: float = 0.01):
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_sample(scope):
+            await self.app(scope, receive, send)
+            return
+
+        frame = sys._getframe()
+        self.profiler.begin(frame, scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end(frame, scope)
+
+    def _should_sample(self, scope) -> bool:
+        if random.random() < self.sample_rate:
+            return True
+        return any(name == PROFILE_HEADER for name, _ in scope["headers"])
@@ -0,0 +1,139 @@
+"""Per-user token-bucket rate limits for write-heavy and expensive endpoints.
+
+Each endpoint class (swipe, chat, like, ai, export) has a bucket per user holding
+up to `burst` tokens, refilled at `rate` tokens per second; a request takes
+one token or is rejected with the seconds until the next one is available,
+sent back as `Retry-After` with a 429.
+
+Limits come from RATE_LIMITS, e.g. "swipe=60/m:30,ai=10/m" (60 per minute
+with bursts of 30; the burst defaults to the count). Buckets live in:
+
+- "memory" (default): a dict in the worker process, capped at `max_keys`
+  buckets by dropping the least recently used. Each worker enforces the
+  limit on its own, so N workers allow up to N times the rate.
+- "mongo": one document per bucket in `rate_limits`, updated atomically
+  with a pipeline update, shared by every worker and instance. Costs one
+  MongoDB round trip per limited request.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+PERIODS = {"s": 1, "m": 60, "h": 3600}
+
+
+class Limit:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate  # tokens per second
+        self.burst = burst
+
+    @property
+    def refill_seconds(self) -> float:
+        """Time for an empty bucket to fill up again"""
+        return self.burst / self.rate
+
+    def __repr__(self):
+        return f"Limit(rate={self.rate:g}/s, burst={self.burst:g})"
+
+
+DEFAULT_LIMITS = {
+    "swipe": Limit(rate=1.0, burst=30),
+    "chat": Limit(rate=0.5, burst=20),
+    "like": Limit(rate=0.5, burst=20),
+    "ai": Limit(rate=10 / 60, burst=5),
+    "export": Limit(rate=5 / 3600, burst=5),
+}
+
+
+def parse_limits(spec: str) -> dict:
+    """Parse "swipe=60/m:30,ai=10/m" on top of the defaults"""
+    limits = dict(DEFAULT_LIMITS)
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        name, value = (part.strip() for part in item.split("=", 1))
+        if name not in DEFAULT_LIMITS:
+            raise ValueError(f"Unknown rate limit class {name!r}")
+        count, _, rest = value.partition("/")
+        period, _, burst = rest.partition(":")
+        limits[name] = Limit(rate=float(count) / PERIODS[period or "s"], burst=float(burst or count))
+    return limits
+
+
+class MemoryBackend:
+    def __init__(self, max_keys: int = 100_000):
+        self.buckets = OrderedDict()  # key -> [tokens, updated_at], least recently used first
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+
+    def ensure_indexes(self):
+        pass
+
+    def acquire(self, key: str, limit: Limit) -> float:
+        """Take a token: 0 when allowed, otherwise the seconds to wait"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self.buckets.pop(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated_at) * limit.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = [tokens, now]
+            # Over the cap, forget the least recently used buckets: the idlest,
+            # so the likeliest to have filled up again (the same as no entry)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / limit.rate
+
+
+class MongoBackend:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        # Idle buckets are full again after their refill time: let MongoDB drop them
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def acquire(self, key: str, limit: Limit) -> float:
+        now = time.time()
+        refilled = {"$min": [limit.burst, {"$add": [
+            {"$ifNull": ["$tokens", limit.burst]},
+            {"$multiply": [{"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}]}, limit.rate]},
+        ]}]}
+        bucket = self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": datetime.now(timezone.utc) + timedelta(seconds=limit.refill_seconds),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return 0.0 if bucket["allowed"] else (1 - bucket["tokens"]) / limit.rate
+
+
+class RateLimiter:
+    def __init__(self, backend, limits: dict):
+        self.backend = backend
+        self.limits = limits
+
+    def acquire(self, endpoint_class: str, user_id: str) -> int:
+        """0 when the request may proceed, otherwise the Retry-After seconds"""
+        wait = self.backend.acquire(f"{endpoint_class}:{user_id}", self.limits[endpoint_class])
+        return math.ceil(wait) if wait > 0 else 0
+
+
+def make_backend(db, backend: str):
+    if backend == "memory":
+        return MemoryBackend()
+    if backend == "mongo":
+        return MongoBackend(db["rate_limits"])
+    raise ValueError(f"Unknown rate limit backend {backend!r}")
@@ -0,0 +1,151 @@
+"""Compatibility scoring for discovery ranking.
+
+Candidates are loaded once as feature columns (NumPy arrays) and scored against
+the current user in a single vectorized pass, with no per-candidate Python
+loop; the top k are then picked with a partial sort.
+
+Every component is a similarity in [0, 1]; missing values on either side score
+a neutral 0.5. The final score is the weighted mean of the components.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+
+import geo
+
+LEVEL_ORDINALS = {"beginner": 0, "intermediate": 1, "expert": 2}
+
+# Fields needed to build the feature columns, used as the candidate pool projection
+FEATURE_PROJECTION = {
+    "age": 1, "avg_distance": 1, "experience_level": 1,
+    "preferred_zone": 1, "geo": 1, "last_active_at": 1, "created_at": 1
+}
+
+DEFAULT_WEIGHTS = {"age": 1.0, "distance": 1.0, "level": 1.0, "zone": 0.5, "proximity": 1.0, "recency": 0.5}
+
+# Decay scales: similarity drops to 1/e at these differences
+AGE_SCALE_YEARS = 10.0
+DISTANCE_SCALE_KM = 40.0
+RECENCY_SCALE_DAYS = 14.0
+PROXIMITY_SCALE_KM = 50.0
+
+
+def parse_weights(spec: str) -> dict:
+    """Parse "age=1,zone=2" into a weights dict on top of the defaults"""
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            if name.strip() not in DEFAULT_WEIGHTS:
+                raise ValueError(f"Unknown scoring weight {name.strip()!r}")
+            weights[name.strip()] = float(value)
+    return weights
+
+
+def epoch_seconds(value) -> float:
+    if not isinstance(value, datetime):
+        return np.nan
+    if value.tzinfo is None:
+        # pymongo returns naive UTC datetimes by default
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class CandidateFeatures:
+    """Column-oriented view of a candidate pool"""
+
+    def __init__(self, ids, age, avg_distance, level, zone, last_active, lat, lng):
+        self.ids = ids
+        self.age = age
+        self.avg_distance = avg_distance
+        self.level = level
+        self.zone = zone
+        self.last_active = last_active
+        self.lat = lat
+        self.lng = lng
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_documents(cls, docs: list) -> "CandidateFeatures":
+        coords = [(d.get("geo") or {}).get("coordinates") or (None, None) for d in docs]
+        return cls(
+            ids=[d["_id"] for d in docs],
+            age=np.array([d.get("age") for d in docs], dtype=float),
+            avg_distance=np.array([d.get("avg_distance") for d in docs], dtype=float),
+            level=np.array([LEVEL_ORDINALS.get(d.get("experience_level"), np.nan) for d in docs], dtype=float),
+            # Spelling-insensitive, so "Emilia Romagna" and "emilia-romagna" match
+            zone=np.array([geo.normalize(d["preferred_zone"]) if d.get("preferred_zone") else None for d in docs], dtype=object),
+            last_active=np.array(
+                [epoch_seconds(d.get("last_active_at") or d.get("created_at")) for d in docs], dtype=float
+            ),
+            lat=np.array([lat for _, lat in coords], dtype=float),
+            lng=np.array([lng for lng, _ in coords], dtype=float),
+        )
+
+
+def _similarity(user_value, column: np.ndarray, scale: float) -> np.ndarray:
+    if user_value is None:
+        return np.full(len(column), 0.5)
+    return np.nan_to_num(np.exp(-np.abs(column - float(user_value)) / scale), nan=0.5)
+
+
+def score(user: dict, features: CandidateFeatures, weights: dict = None, now: datetime = None) -> np.ndarray:
+    weights = weights or DEFAULT_WEIGHTS
+    now_ts = (now or datetime.now(timezone.utc)).timestamp()
+    n = len(features)
+    user_coords = (user.get("geo") or {}).get("coordinates")
+
+    components = {
+        "age": lambda: _similarity(user.get("age"), features.age, AGE_SCALE_YEARS),
+        "distance": lambda: _similarity(user.get("avg_distance"), features.avg_distance, DISTANCE_SCALE_KM),
+        "level": lambda: (
+            np.nan_to_num(1.0 - np.abs(features.level - LEVEL_ORDINALS[user["experience_level"]]) / 2, nan=0.5)
+            if user.get("experience_level") in LEVEL_ORDINALS else np.full(n, 0.5)
+        ),
+        "zone": lambda: (
+            np.where(
+                features.zone == None,  # noqa: E711 - elementwise on the object array
+                0.5,
+                (features.zone == geo.normalize(user["preferred_zone"])).astype(float),
+            )
+            if user.get("preferred_zone") else np.full(n, 0.5)
+        ),
+        "proximity": lambda: (
+            np.nan_to_num(np.exp(
+                -geo.haversine_km(user_coords[1], user_coords[0], features.lat, features.lng) / PROXIMITY_SCALE_KM
+            ), nan=0.5)
+            if user_coords else np.full(n, 0.5)
+        ),
+        "recency": lambda: np.nan_to_num(
+            np.exp(-np.maximum(now_ts - features.last_active, 0) / (RECENCY_SCALE_DAYS * 86400)), nan=0.5
+        ),
+    }
+
+    total = np.zeros(n)
+    weight_sum = 0.0
+    for name, weight in weights.items():
+        if weight:
+            total += weight * components[name]()
+            weight_sum += weight
+    return total / weight_sum if weight_sum else total
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, best first, via partial sort"""
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=int)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def rank(user: dict, docs: list, k: int, weights: dict = None) -> list:
+    """[(candidate id, score)] for the k most compatible candidates"""
+    features = CandidateFeatures.from_documents(docs)
+    scores = score(user, features, weights)
+    return [(features.ids[i], float(scores[i])) for i in top_k(scores, k)]
+
@@ -0,0 +1,88 @@
+"""Route search: text query, tag facets and relevance ranking.
+
+Matching uses a MongoDB text index over title, tags and description (Italian
+stemming, title weighted highest), so `q=sterrati toscana` also finds
+"Sterrato" and ranks title hits first. Tag facet counts come from an
+aggregation over the same filters; they are cached per filter set for a short
+TTL since they change slowly and are the expensive part of a search.
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+TEXT_INDEX = [("title", "text"), ("tags", "text"), ("description", "text")]
+TEXT_INDEX_OPTIONS = {
+    "name": "route_text",
+    "weights": {"title": 10, "tags": 5, "description": 1},
+    "default_language": "italian",
+}
+
+FACET_LIMIT = 50
+
+
+def build_query(
+    q: Optional[str] = None,
+    tags: Optional[list] = None,
+    difficulty: Optional[str] = None,
+    min_distance: Optional[float] = None,
+    max_distance: Optional[float] = None,
+    max_grade: Optional[float] = None,
+    collapse_duplicates: bool = False,
+) -> dict:
+    query = {}
+    if q and q.strip():
+        query["$text"] = {"$search": q.strip()}
+    if tags:
+        # Sorted so equivalent filters share a facet cache entry
+        query["tags"] = {"$all": sorted(tags)}
+    if difficulty:
+        query["difficulty"] = difficulty
+    if min_distance is not None or max_distance is not None:
+        query["distance"] = {}
+        if min_distance is not None:
+            query["distance"]["$gte"] = min_distance
+        if max_distance is not None:
+            query["distance"]["$lte"] = max_distance
+    if max_grade is not None:
+        # Steepest 100 m climb, computed from the track at creation (see tracks.py)
+        query["stats.max_grade"] = {"$lte": max_grade}
+    if collapse_duplicates:
+        # Only the first upload of a loop (see fingerprints.py); also matches routes predating the link
+        query["duplicate_of"] = None
+    return query
+
+
+def facet_pipeline(query: dict) -> list:
+    return [
+        {"$match": query},
+        {"$unwind": "$tags"},
+        {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": FACET_LIMIT},
+    ]
+
+
+class FacetCache:
+    """Tag counts per filter set, expiring after `ttl` seconds, at most `size` entries"""
+
+    def __init__(self, ttl: float = 60.0, size: int = 256):
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()
+
+    def get(self, collection, query: dict) -> dict:
+        key = repr(sorted(query.items()))
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry and entry[0] > now:
+            self._entries.move_to_end(key)
+            return entry[1]
+        counts = {doc["_id"]: doc["count"] for doc in collection.aggregate(facet_pipeline(query))}
+        self._entries[key] = (now + self.ttl, counts)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return counts
+
+    def clear(self):
+        self._entries.clear()
@@ -1,21 +1,68 @@
-from fastapi import FastAPI, HTTPException, status, Depends, Query, UploadFile, File
+from fastapi import FastAPI, HTTPException, status, Depends, Query, UploadFile, File, Header
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Annotated
 from datetime import datetime, timezone, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pymongo import MongoClient
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 from bson import ObjectId
+import asyncio
+import hashlib
+import logging
 import os
+import secrets
+import time
 from dotenv import load_dotenv
-import cloudinary
-import cloudinary.uploader
+import chat
+import compression
+import export
+import fieldsets
+import fingerprints
+import geo
+import health
+import images
+import metrics
+import profiler
+import ratelimit
+import scoring
+import search
+import tracing
+import tracks
+
+# jose, passlib, cloudinary and emergentintegrations are imported on first use
+# (or during warm-up) to keep module import and cold starts fast
 
 load_dotenv()
 
-app = FastAPI(title="GravelMatch API", version="2.0.0")
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+QUERY_TRACE = os.environ.get("QUERY_TRACE", "false").lower() == "true"
+QUERY_BUDGET_ENFORCE = os.environ.get("QUERY_BUDGET_ENFORCE", "false").lower() == "true"
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_SAMPLE_RATE = float(os.environ.get("PROFILER_SAMPLE_RATE", "0.01"))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() == "true"
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up()
+    if os.environ.get("EMERGENT_LLM_KEY"):
+        match_tips_pool.start()
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop_lag()) if METRICS_ENABLED else None
+    yield
+    if lag_monitor:
+        lag_monitor.cancel()
+    await match_tips_pool.stop()
+
+app = FastAPI(title="GravelMatch API", version="2.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,10 +76,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+sampling_profiler = profiler.SamplingProfiler(float(os.environ.get("PROFILER_INTERVAL_MS", "5")))
+
+if COMPRESSION_ENABLED:
+    app.add_middleware(
+        compression.CompressionMiddleware, minimum_size=int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+    )
+if PROFILER_ENABLED:
+    app.add_middleware(profiler.ProfilerMiddleware, profiler=sampling_profiler, sample_rate=PROFILER_SAMPLE_RATE)
+if QUERY_TRACE:
+    app.add_middleware(
+        tracing.QueryTraceMiddleware,
+        budgets=tracing.load_budgets(int(RATE_LIMIT_ENABLED and RATE_LIMIT_BACKEND == "mongo")),
+        enforce=QUERY_BUDGET_ENFORCE
+    )
+if METRICS_ENABLED:
+    app.add_middleware(metrics.PrometheusMiddleware)
+
 # Database
 MONGO_URL = os.environ.get("MONGO_URL")
 DB_NAME = os.environ.get("DB_NAME")
-client = MongoClient(MONGO_URL)
+# connect=False defers the first connection until a command is issued
+command_listeners = []
+if METRICS_ENABLED:
+    command_listeners.append(metrics.MongoCommandMetrics())
+if QUERY_TRACE:
+    command_listeners.append(tracing.QueryTraceListener())
+client = MongoClient(MONGO_URL, connect=False, event_listeners=command_listeners)
 db = client[DB_NAME]
 
 # Collections
@@ -43,19 +113,61 @@ messages_collection = db["messages"]
 swipes_collection = db["swipes"]
 notifications_collection = db["notifications"]
 
-# Cloudinary Configuration
-cloudinary.config(
-    cloud_name=os.environ.get("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.environ.get("CLOUDINARY_API_KEY"),
-    api_secret=os.environ.get("CLOUDINARY_API_SECRET")
+# Read-only listings that tolerate replication lag can be served by secondaries
+READ_PREFERENCE = make_read_preference(
+    read_pref_mode_from_name(os.environ.get("MONGO_READ_PREFERENCE", "primary")),
+    None,
+    int(os.environ.get("MONGO_MAX_STALENESS_SECONDS", "-1"))
 )
+routes_read_collection = routes_collection.with_options(read_preference=READ_PREFERENCE)
+notifications_read_collection = notifications_collection.with_options(read_preference=READ_PREFERENCE)
+
+# Chat history: one document per message, or per-match buckets (see chat.py)
+CHAT_STORAGE = os.environ.get("CHAT_STORAGE", "documents")
+chat_store = chat.make_store(db, CHAT_STORAGE, int(os.environ.get("CHAT_BUCKET_SIZE", str(chat.DEFAULT_BUCKET_SIZE))))
+
+# GET /api/export streams through cursors read this many documents at a time
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", str(export.DEFAULT_BATCH_SIZE)))
+
+# Per-user token buckets for swipes, messages, likes, AI calls and exports (see ratelimit.py)
+rate_limiter = ratelimit.RateLimiter(
+    ratelimit.make_backend(db, RATE_LIMIT_BACKEND),
+    ratelimit.parse_limits(os.environ.get("RATE_LIMITS", ""))
+)
+
+# Cloudinary Configuration
+@lru_cache(maxsize=None)
+def get_cloudinary_uploader():
+    import cloudinary
+    import cloudinary.uploader
+
+    cloudinary.config(
+        cloud_name=os.environ.get("CLOUDINARY_CLOUD_NAME"),
+        api_key=os.environ.get("CLOUDINARY_API_KEY"),
+        api_secret=os.environ.get("CLOUDINARY_API_SECRET")
+    )
+    return cloudinary.uploader
+
+# Uploaded pictures are stored as thumb/card/full variants (see images.py)
+IMAGE_BACKEND = os.environ.get("IMAGE_BACKEND", "cloudinary")
+IMAGE_LOCAL_DIR = os.environ.get("IMAGE_LOCAL_DIR", os.path.join(os.path.dirname(__file__), "uploads"))
+IMAGE_LOCAL_URL = os.environ.get("IMAGE_LOCAL_URL", "/uploads")
+image_store = images.make_store(IMAGE_BACKEND, get_cloudinary_uploader, IMAGE_LOCAL_DIR, IMAGE_LOCAL_URL)
+if IMAGE_BACKEND == "local":
+    os.makedirs(IMAGE_LOCAL_DIR, exist_ok=True)
+    app.mount(IMAGE_LOCAL_URL, StaticFiles(directory=IMAGE_LOCAL_DIR), name="uploads")
 
 # Security
 SECRET_KEY = os.environ.get("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 security = HTTPBearer()
 
 # Pydantic Models
@@ -77,6 +189,8 @@ class UserProfile(BaseModel):
     preferred_zone: Optional[str] = None
     location: Optional[str] = None
     age: Optional[int] = None
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
 
 class DiscoverFilters(BaseModel):
     min_age: Optional[int] = None
@@ -86,16 +200,34 @@ class DiscoverFilters(BaseModel):
     experience_level: Optional[str] = None
     zone: Optional[str] = None
 
+class ImageVariants(BaseModel):
+    thumb: str
+    card: str
+    full: str
+
+class Waypoint(BaseModel):
+    # Extra keys from the client (GPX time, heart rate...) are stored as sent
+    model_config = ConfigDict(extra="allow")
+
+    lat: float = Field(ge=-90, le=90)
+    lng: float = Field(ge=-180, le=180)
+    ele: Optional[float] = None
+    surface: Optional[str] = None
+    name: Optional[str] = None
+
 class RouteCreate(BaseModel):
     title: str
     description: Optional[str] = None
-    distance: float
+    # Derived from the waypoints when the track has at least two points
+    distance: Optional[float] = None
     elevation: Optional[int] = None
     difficulty: str
     start_point: dict
     end_point: Optional[dict] = None
-    waypoints: Optional[List[dict]] = []
+    waypoints: Optional[List[Waypoint]] = []
     image_url: Optional[str] = None
+    # As returned by /api/upload/image, stored alongside image_url
+    image_variants: Optional[ImageVariants] = None
     tags: Optional[List[str]] = []
 
 class SwipeAction(BaseModel):
@@ -116,24 +248,27 @@ class NotificationSubscription(BaseModel):
 
 # Helper functions
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def serialize_user(user: dict) -> dict:
+def serialize_user(user: dict, image: str = "full") -> dict:
+    """`image` is the picture variant for the view: thumb, card or full"""
     return {
         "id": str(user["_id"]),
         "email": user.get("email"),
         "name": user.get("name"),
         "bio": user.get("bio"),
-        "profile_picture": user.get("profile_picture"),
+        "profile_picture": images.pick(user.get("profile_picture_variants"), user.get("profile_picture"), image),
         "experience_level": user.get("experience_level"),
         "avg_distance": user.get("avg_distance"),
         "preferred_zone": user.get("preferred_zone"),
@@ -143,7 +278,7 @@ def serialize_user(user: dict) -> dict:
         "created_at": user.get("created_at").isoformat() if user.get("created_at") else None
     }
 
-def serialize_route(route: dict) -> dict:
+def serialize_route(route: dict, image: str = "full") -> dict:
     return {
         "id": str(route["_id"]),
         "title": route.get("title"),
@@ -154,29 +289,236 @@ def serialize_route(route: dict) -> dict:
         "start_point": route.get("start_point"),
         "end_point": route.get("end_point"),
         "waypoints": route.get("waypoints", []),
-        "image_url": route.get("image_url"),
+        "image_url": images.pick(route.get("image_variants"), route.get("image_url"), image),
         "tags": route.get("tags", []),
         "user_id": str(route.get("user_id")),
         "user_name": route.get("user_name"),
         "likes": route.get("likes", 0),
+        "stats": route.get("stats"),
+        "duplicate_of": str(route["duplicate_of"]) if route.get("duplicate_of") else None,
+        "duplicates": route.get("duplicates", 0),
         "created_at": route.get("created_at").isoformat() if route.get("created_at") else None
     }
 
-async def get_current_user(credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]):
-    token = credentials.credentials
+# AI match tips
+MATCH_TIPS_WORKERS = int(os.environ.get("MATCH_TIPS_WORKERS", "2"))
+MATCH_TIPS_FIELDS = ["experience_level", "avg_distance", "preferred_zone"]
+
+def match_tips_fingerprint(user_a: dict, user_b: dict) -> str:
+    """Hash of the profile fields the tips depend on, independent of user order"""
+    profiles = sorted(
+        [str(u["_id"])] + [str(u.get(f)) for f in MATCH_TIPS_FIELDS]
+        for u in (user_a, user_b)
+    )
+    return hashlib.sha1(repr(profiles).encode()).hexdigest()
+
+async def generate_match_tips(user: dict, target: dict) -> str:
+    from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+    chat = LlmChat(
+        api_key=os.environ.get("EMERGENT_LLM_KEY"),
+        session_id=f"match_tips_{str(user['_id'])}_{str(target['_id'])}",
+        system_message="Sei un esperto di ciclismo e connessioni sociali. Suggerisci spunti di conversazione basati sui profili dei ciclisti. Rispondi in italiano, brevemente."
+    ).with_model("openai", "gpt-5.2")
+    
+    user_message = UserMessage(
+        text=f"Utente 1: livello {user.get('experience_level', 'N/A')}, distanza media {user.get('avg_distance', 'N/A')}km, zona {user.get('preferred_zone', 'N/A')}. Utente 2: livello {target.get('experience_level', 'N/A')}, distanza media {target.get('avg_distance', 'N/A')}km, zona {target.get('preferred_zone', 'N/A')}. Suggerisci 2 spunti di conversazione per rompere il ghiaccio."
+    )
+    
+    return await chat.send_message(user_message)
+
+def store_match_tips(match_id: ObjectId, tips: str, fingerprint: str):
+    matches_collection.update_one(
+        {"_id": match_id},
+        {"$set": {"ai_tips": {
+            "text": tips,
+            "fingerprint": fingerprint,
+            "generated_at": datetime.now(timezone.utc)
+        }}}
+    )
+
+async def refresh_match_tips(match_id: ObjectId) -> bool:
+    """Generate tips for a match unless the stored ones are still current"""
+    match = matches_collection.find_one({"_id": match_id})
+    if not match:
+        return False
+    
+    users = {u["_id"]: u for u in users_collection.find({"_id": {"$in": match["users"]}})}
+    if len(users) != 2:
+        return False
+    user_a, user_b = (users[u] for u in match["users"])
+    
+    fingerprint = match_tips_fingerprint(user_a, user_b)
+    if match.get("ai_tips", {}).get("fingerprint") == fingerprint:
+        return False
+    
+    tips = await generate_match_tips(user_a, user_b)
+    store_match_tips(match_id, tips, fingerprint)
+    return True
+
+class MatchTipsPool:
+    """Background workers that precompute AI tips for new or changed matches"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.queue: Optional[asyncio.Queue] = None
+        self.pending = set()
+        self.tasks = []
+        self.stats = {"enqueued": 0, "generated": 0, "skipped": 0, "failed": 0, "in_progress": 0}
+        self.last_wait_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self.tasks)
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def enqueue(self, match_id: ObjectId):
+        """Schedule a match for (re)generation; duplicates already waiting are dropped"""
+        if not self.running or match_id in self.pending:
+            return
+        self.pending.add(match_id)
+        self.queue.put_nowait((match_id, datetime.now(timezone.utc)))
+        self.stats["enqueued"] += 1
+        metrics.MATCH_TIPS_BACKLOG.set(self.queue.qsize())
+
+    async def _worker(self):
+        while True:
+            match_id, enqueued_at = await self.queue.get()
+            metrics.MATCH_TIPS_BACKLOG.set(self.queue.qsize())
+            self.pending.discard(match_id)
+            self.last_wait_seconds = (datetime.now(timezone.utc) - enqueued_at).total_seconds()
+            self.stats["in_progress"] += 1
+            try:
+                generated = await refresh_match_tips(match_id)
+                self.stats["generated" if generated else "skipped"] += 1
+            except Exception:
+                logger.exception("Match tips generation failed for %s", match_id)
+                self.stats["failed"] += 1
+            finally:
+                self.stats["in_progress"] -= 1
+                self.queue.task_done()
+
+    def metrics(self) -> dict:
+        return {
+            "workers": len(self.tasks),
+            "backlog": self.queue.qsize() if self.queue else 0,
+            "last_wait_seconds": round(self.last_wait_seconds, 3),
+            **self.stats
+        }
+
+match_tips_pool = MatchTipsPool(MATCH_TIPS_WORKERS)
+
+# Warm-up: run before the app starts accepting requests
+WARMUP_STEPS = [s.strip() for s in os.environ.get("WARMUP_STEPS", "db,indexes,auth,llm").split(",") if s.strip()]
+
+def warm_up_db():
+    client.admin.command("ping")
+
+def ensure_indexes():
+    chat_store.ensure_indexes()
+    rate_limiter.backend.ensure_indexes()
+    matches_collection.create_index("users")
+    swipes_collection.create_index([("user_id", 1), ("target_user_id", 1)])
+    users_collection.create_index([("geo", "2dsphere")])
+    users_collection.create_index("zone_key")
+    routes_collection.create_index(search.TEXT_INDEX, **search.TEXT_INDEX_OPTIONS)
+    routes_collection.create_index("tags")
+    routes_collection.create_index("stats.max_grade")
+    routes_collection.create_index("fingerprint.bands")
+    notifications_collection.create_index([("user_id", 1), ("created_at", -1)])
+
+def warm_up_auth():
+    from jose import jwt  # noqa: F401
+
+    # The first hash loads and self-tests the bcrypt backend
+    get_pwd_context().hash("warm-up")
+
+def warm_up_llm():
+    from emergentintegrations.llm.chat import LlmChat, UserMessage  # noqa: F401
+
+def warm_up_uploads():
+    if IMAGE_BACKEND == "local":
+        from PIL import Image, ImageOps  # noqa: F401
+    else:
+        get_cloudinary_uploader()
+
+WARMUP_TASKS = {
+    "db": warm_up_db,
+    "indexes": ensure_indexes,
+    "auth": warm_up_auth,
+    "llm": warm_up_llm,
+    "uploads": warm_up_uploads,
+}
+
+async def warm_up() -> dict:
+    """Run the configured warm-up steps; failures are logged, never fatal"""
+    timings = {}
+    for name in WARMUP_STEPS:
+        task = WARMUP_TASKS.get(name)
+        if task is None:
+            logger.warning("Unknown warm-up step %r", name)
+            continue
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(task)
+        except Exception as e:
+            logger.warning("Warm-up step %r failed: %s", name, e)
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("Warm-up completed in ms: %s", timings)
+    app.state.warmup_ms = timings
+    return timings
+
+def token_subject(credentials: HTTPAuthorizationCredentials) -> str:
+    """Email the bearer token was issued to; 401 when invalid"""
+    from jose import JWTError, jwt
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
+        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload["sub"]
+
+async def get_current_user(credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]):
+    email = token_subject(credentials)
     user = users_collection.find_one({"email": email})
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
+async def require_admin(x_admin_token: Annotated[Optional[str], Header()] = None):
+    if not ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+def rate_limited(endpoint_class: str):
+    """Dependency taking a token from the caller's bucket for `endpoint_class`, 429 when empty.
+
+    Keyed on the token subject and run before get_current_user, so a rejected
+    request costs no database lookup.
+    """
+    async def check(credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]):
+        if not RATE_LIMIT_ENABLED:
+            return
+        retry_after = rate_limiter.acquire(endpoint_class, token_subject(credentials))
+        if retry_after:
+            metrics.RATE_LIMITED.labels(endpoint_class).inc()
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(retry_after)}
+            )
+    return check
+
 # Auth Endpoints
 @app.post("/api/auth/register", response_model=TokenResponse)
 async def register(user_data: UserCreate):
@@ -202,6 +544,9 @@ async def login(user_data: UserLogin):
     if not user or not verify_password(user_data.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Activity recency feeds the discovery ranking
+    users_collection.update_one({"_id": user["_id"]}, {"$set": {"last_active_at": datetime.now(timezone.utc)}})
+    
     access_token = create_access_token(data={"sub": user_data.email})
     return TokenResponse(access_token=access_token)
 
@@ -213,6 +558,26 @@ async def get_me(current_user = Depends(get_current_user)):
 @app.put("/api/profile")
 async def update_profile(profile: UserProfile, current_user = Depends(get_current_user)):
     update_data = {k: v for k, v in profile.model_dump().items() if v is not None}
+    latitude = update_data.pop("latitude", None)
+    longitude = update_data.pop("longitude", None)
+    
+    unset = {}
+    # Store a GeoJSON point: explicit coordinates win over gazetteer lookups of the place names
+    if latitude is not None and longitude is not None:
+        update_data["geo"] = geo.point(latitude, longitude)
+        update_data["geo_source"] = "coordinates"
+    elif current_user.get("geo_source") != "coordinates" and ("location" in update_data or "preferred_zone" in update_data):
+        point = geo.geocode(update_data.get("location", current_user.get("location"))) or \
+            geo.geocode(update_data.get("preferred_zone", current_user.get("preferred_zone")))
+        if point:
+            update_data["geo"] = point
+            update_data["geo_source"] = "gazetteer"
+        elif current_user.get("geo"):
+            # The old point belongs to the previous place: don't keep showing the rider there
+            unset.update({"geo": "", "geo_source": ""})
+    # Spelling-insensitive key for the zone= filter ("Emilia Romagna" == "emilia-romagna")
+    if "preferred_zone" in update_data:
+        update_data["zone_key"] = geo.normalize(update_data["preferred_zone"])
     
     if update_data:
         required_fields = ["experience_level", "avg_distance", "preferred_zone"]
@@ -220,10 +585,19 @@ async def update_profile(profile: UserProfile, current_user = Depends(get_curren
         profile_completed = all(current_data.get(f) for f in required_fields)
         update_data["profile_completed"] = profile_completed
         
-        users_collection.update_one(
-            {"_id": current_user["_id"]},
-            {"$set": update_data}
-        )
+        # A picture URL set by hand has no variants: drop those of the previous upload
+        if "profile_picture" in update_data and \
+                update_data["profile_picture"] != images.pick(current_user.get("profile_picture_variants"), None, "full"):
+            unset["profile_picture_variants"] = ""
+        update = {"$set": update_data, **({"$unset": unset} if unset else {})}
+        users_collection.update_one({"_id": current_user["_id"]}, update)
+        
+        # Tips depend on these fields: refresh them for every match in the background
+        if match_tips_pool.running and any(
+            f in update_data and update_data[f] != current_user.get(f) for f in MATCH_TIPS_FIELDS
+        ):
+            for m in matches_collection.find({"users": current_user["_id"]}, {"_id": 1}):
+                match_tips_pool.enqueue(m["_id"])
     
     updated_user = users_collection.find_one({"_id": current_user["_id"]})
     return serialize_user(updated_user)
@@ -235,29 +609,18 @@ async def upload_image(
     folder: str = Query(default="gravelmatch"),
     current_user = Depends(get_current_user)
 ):
-    """Upload image to Cloudinary"""
+    """Upload an image and its thumb/card/full variants"""
     try:
-        # Read file content
         contents = await file.read()
-        
-        # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
-            contents,
-            folder=folder,
-            resource_type="image",
-            transformation=[
-                {"width": 1200, "height": 1200, "crop": "limit"},
-                {"quality": "auto:good"},
-                {"fetch_format": "auto"}
-            ]
-        )
+        result = await asyncio.to_thread(image_store.store, contents, folder, images.ROUTE_VARIANTS)
         
         return {
             "success": True,
-            "url": result["secure_url"],
+            "url": result["variants"]["full"],
+            "variants": result["variants"],
             "public_id": result["public_id"],
-            "width": result.get("width"),
-            "height": result.get("height")
+            "width": result["width"],
+            "height": result["height"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
@@ -270,43 +633,63 @@ async def upload_profile_picture(
     """Upload and set profile picture"""
     try:
         contents = await file.read()
-        
-        result = cloudinary.uploader.upload(
-            contents,
-            folder="gravelmatch/profiles",
-            resource_type="image",
-            transformation=[
-                {"width": 500, "height": 500, "crop": "fill", "gravity": "face"},
-                {"quality": "auto:good"},
-                {"fetch_format": "auto"}
-            ]
+        result = await asyncio.to_thread(
+            image_store.store, contents, "gravelmatch/profiles", images.PROFILE_VARIANTS
         )
         
-        # Update user profile
+        # Update user profile: profile_picture stays the full variant for older clients
         users_collection.update_one(
             {"_id": current_user["_id"]},
-            {"$set": {"profile_picture": result["secure_url"]}}
+            {"$set": {"profile_picture": result["variants"]["full"], "profile_picture_variants": result["variants"]}}
         )
         
         return {
             "success": True,
-            "url": result["secure_url"]
+            "url": result["variants"]["full"],
+            "variants": result["variants"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 # Routes Endpoints
+def analyze_track(waypoints: list) -> tuple:
+    track = tracks.Track.from_waypoints(waypoints)
+    return tracks.compute(track), fingerprints.compute(track.lat, track.lng)
+
 @app.post("/api/routes")
 async def create_route(route_data: RouteCreate, current_user = Depends(get_current_user)):
+    # Distance and elevation gain come from the track when there is one, not from the client
+    waypoints = [w.model_dump(exclude_none=True) for w in route_data.waypoints or []]
+    stats, fingerprint = await asyncio.to_thread(analyze_track, waypoints)
     new_route = {
         **route_data.model_dump(),
+        "waypoints": waypoints,
+        "stats": stats,
+        "fingerprint": fingerprint,
+        "duplicate_of": None,
         "user_id": current_user["_id"],
         "user_name": current_user.get("name"),
         "likes": 0,
         "created_at": datetime.now(timezone.utc)
     }
+    if stats:
+        new_route["distance"] = round(stats["distance_km"], 1)
+        if stats["ascent_m"] is not None:
+            new_route["elevation"] = round(stats["ascent_m"])
+    elif new_route["distance"] is None:
+        raise HTTPException(status_code=400, detail="Distance required without a track")
+    # Variants only stand for the image they were uploaded with
+    if new_route["image_variants"] and new_route["image_variants"]["full"] != new_route["image_url"]:
+        new_route["image_variants"] = None
+    
+    # Re-uploads of a known loop are linked to the first upload and hidden from listings
+    duplicate = fingerprints.find_duplicate(routes_collection, fingerprint) if fingerprint else None
+    if duplicate:
+        new_route["duplicate_of"] = duplicate[0]
     result = routes_collection.insert_one(new_route)
     new_route["_id"] = result.inserted_id
+    if duplicate:
+        routes_collection.update_one({"_id": duplicate[0]}, {"$inc": {"duplicates": 1}})
     return serialize_route(new_route)
 
 @app.get("/api/routes")
@@ -314,35 +697,64 @@ async def get_routes(
     difficulty: Optional[str] = None,
     min_distance: Optional[float] = None,
     max_distance: Optional[float] = None,
+    max_grade: Optional[float] = None,
+    include_duplicates: bool = False,
+    fields: Optional[str] = None,
     limit: int = Query(default=20, le=100)
 ):
-    query = {}
-    if difficulty:
-        query["difficulty"] = difficulty
-    if min_distance is not None:
-        query["distance"] = {"$gte": min_distance}
-    if max_distance is not None:
-        if "distance" in query:
-            query["distance"]["$lte"] = max_distance
-        else:
-            query["distance"] = {"$lte": max_distance}
-    
-    routes = routes_collection.find(query).sort("created_at", -1).limit(limit)
-    return [serialize_route(r) for r in routes]
+    selected = fieldsets.FieldSet(fields, fieldsets.ROUTE_FIELDS)
+    query = search.build_query(
+        difficulty=difficulty, min_distance=min_distance, max_distance=max_distance, max_grade=max_grade,
+        collapse_duplicates=not include_duplicates
+    )
+    routes = routes_read_collection.find(query, selected.projection()).sort("created_at", -1).limit(limit)
+    return [selected.apply(serialize_route(r, image="card")) for r in routes]
+
+route_facets = search.FacetCache(ttl=float(os.environ.get("ROUTE_FACETS_TTL", "60")))
+
+@app.get("/api/routes/search")
+async def search_routes(
+    q: Optional[str] = None,
+    tags: Optional[List[str]] = Query(default=None),
+    difficulty: Optional[str] = None,
+    min_distance: Optional[float] = None,
+    max_distance: Optional[float] = None,
+    max_grade: Optional[float] = None,
+    include_duplicates: bool = False,
+    fields: Optional[str] = None,
+    limit: int = Query(default=20, le=100)
+):
+    """Full-text route search with tag facets; most relevant first, newest first without `q`"""
+    selected = fieldsets.FieldSet(fields, fieldsets.SEARCH_ROUTE_FIELDS)
+    query = search.build_query(q, tags, difficulty, min_distance, max_distance, max_grade, not include_duplicates)
+    if "$text" in query:
+        relevance = {"$meta": "textScore"}
+        projection = {**(selected.projection() or {}), "score": relevance}
+        routes = routes_collection.find(query, projection).sort([("score", relevance), ("likes", -1)])
+    else:
+        routes = routes_collection.find(query, selected.projection()).sort("created_at", -1)
+    return {
+        "results": [
+            selected.apply({**serialize_route(r, image="card"), "score": round(r["score"], 3) if "score" in r else None})
+            for r in routes.limit(limit)
+        ],
+        "facets": route_facets.get(routes_collection, query)
+    }
 
 @app.get("/api/routes/{route_id}")
 async def get_route(route_id: str):
-    route = routes_collection.find_one({"_id": ObjectId(route_id)})
+    route = routes_read_collection.find_one({"_id": ObjectId(route_id)})
     if not route:
         raise HTTPException(status_code=404, detail="Route not found")
     return serialize_route(route)
 
 @app.get("/api/routes/user/me")
-async def get_my_routes(current_user = Depends(get_current_user)):
-    routes = routes_collection.find({"user_id": current_user["_id"]}).sort("created_at", -1)
-    return [serialize_route(r) for r in routes]
+async def get_my_routes(fields: Optional[str] = None, current_user = Depends(get_current_user)):
+    selected = fieldsets.FieldSet(fields, fieldsets.ROUTE_FIELDS)
+    routes = routes_collection.find({"user_id": current_user["_id"]}, selected.projection()).sort("created_at", -1)
+    return [selected.apply(serialize_route(r, image="card")) for r in routes]
 
-@app.post("/api/routes/{route_id}/like")
+@app.post("/api/routes/{route_id}/like", dependencies=[Depends(rate_limited("like"))])
 async def like_route(route_id: str, current_user = Depends(get_current_user)):
     routes_collection.update_one(
         {"_id": ObjectId(route_id)},
@@ -351,6 +763,14 @@ async def like_route(route_id: str, current_user = Depends(get_current_user)):
     return {"success": True}
 
 # Discovery/Matching Endpoints with Advanced Filters
+DISCOVER_PAGE_SIZE = 20
+DISCOVER_CANDIDATE_POOL = int(os.environ.get("DISCOVER_CANDIDATE_POOL", "2000"))
+DISCOVER_WEIGHTS = scoring.parse_weights(os.environ.get("DISCOVER_WEIGHTS", ""))
+# First-page slots reserved for riders who already liked the caller
+DISCOVER_ADMIRER_SLOTS = int(os.environ.get("DISCOVER_ADMIRER_SLOTS", "5"))
+# Inbound likes kept on each user document (most recent)
+ADMIRERS_MAX = 500
+
 @app.get("/api/discover")
 async def discover_users(
     min_age: Optional[int] = None,
@@ -359,11 +779,27 @@ async def discover_users(
     max_distance: Optional[int] = None,
     experience_level: Optional[str] = None,
     zone: Optional[str] = None,
+    within_km: Optional[float] = Query(default=None, gt=0),
+    sort: str = Query(default="score", pattern="^(score|distance)$"),
+    fields: Optional[str] = None,
     current_user = Depends(get_current_user)
 ):
     """Discover users with advanced filters"""
+    selected = fieldsets.FieldSet(fields, fieldsets.DISCOVER_FIELDS)
+    user_geo = current_user.get("geo")
+    if (within_km or sort == "distance") and not user_geo:
+        raise HTTPException(status_code=400, detail="Location required for distance filters")
+    
+    def discovered(user: dict, compatibility: Optional[float] = None) -> dict:
+        distance = geo.distance_km(user_geo, user.get("geo"))
+        return selected.apply({
+            **serialize_user(user, image="card"),
+            "distance_km": round(distance, 1) if distance is not None else None,
+            "compatibility": round(compatibility, 3) if compatibility is not None else None
+        })
+
     # Get users this user has already swiped on
-    swiped = swipes_collection.find({"user_id": current_user["_id"]})
+    swiped = swipes_collection.find({"user_id": current_user["_id"]}, {"target_user_id": 1})
     swiped_ids = [s["target_user_id"] for s in swiped]
     swiped_ids.append(current_user["_id"])
     
@@ -403,14 +839,47 @@ async def discover_users(
         }
         query["experience_level"] = {"$in": levels.get(current_user["experience_level"], [])}
     
-    # Zone filter
+    # Zone filter, on the normalized name
     if zone:
-        query["preferred_zone"] = zone
+        query["zone_key"] = geo.normalize(zone)
+    
+    # Proximity (2dsphere index): nearest first, or a radius around the user's location
+    if sort == "distance":
+        near = {"$geometry": user_geo}
+        if within_km:
+            near["$maxDistance"] = within_km * 1000
+        query["geo"] = {"$nearSphere": near}
+        return [discovered(u) for u in users_collection.find(query, selected.projection()).limit(DISCOVER_PAGE_SIZE)]
+    if within_km:
+        query["geo"] = {"$geoWithin": {"$centerSphere": [user_geo["coordinates"], within_km / geo.EARTH_RADIUS_KM]}}
+    
+    # Pending admirers (inbound likes not yet answered) that pass the filters go first:
+    # a like from the caller is an instant match
+    page = []
+    swiped_set = set(swiped_ids)
+    admirer_ids = [a for a in current_user.get("admirers", []) if a not in swiped_set]
+    if admirer_ids and DISCOVER_ADMIRER_SLOTS > 0:
+        admirers = list(users_collection.find(
+            {**query, "_id": {"$in": admirer_ids}}, selected.projection(*scoring.FEATURE_PROJECTION)
+        ))
+        ranked = scoring.rank(current_user, admirers, DISCOVER_ADMIRER_SLOTS, DISCOVER_WEIGHTS)
+        by_id = {u["_id"]: u for u in admirers}
+        page = [discovered(by_id[user_id], score) for user_id, score in ranked]
+        query["_id"]["$nin"] = swiped_ids + [user_id for user_id, _ in ranked]
     
-    users = users_collection.find(query).limit(20)
-    return [serialize_user(u) for u in users]
+    # Rank a bounded candidate pool on its feature fields, then load only the winning page
+    pool = users_collection.find(query, scoring.FEATURE_PROJECTION).limit(DISCOVER_CANDIDATE_POOL).batch_size(DISCOVER_CANDIDATE_POOL)
+    ranked = scoring.rank(current_user, list(pool), DISCOVER_PAGE_SIZE - len(page), DISCOVER_WEIGHTS)
+    if not ranked:
+        return page
+    
+    users = {
+        u["_id"]: u
+        for u in users_collection.find({"_id": {"$in": [user_id for user_id, _ in ranked]}}, selected.projection())
+    }
+    return page + [discovered(users[user_id], score) for user_id, score in ranked if user_id in users]
 
-@app.post("/api/swipe")
+@app.post("/api/swipe", dependencies=[Depends(rate_limited("swipe"))])
 async def swipe(action: SwipeAction, current_user = Depends(get_current_user)):
     target_id = ObjectId(action.target_user_id)
     
@@ -422,17 +891,29 @@ async def swipe(action: SwipeAction, current_user = Depends(get_current_user)):
         "created_at": datetime.now(timezone.utc)
     })
     
+    # Answering an admirer, either way, takes them out of the inbound-like index
+    admirer = target_id in current_user.get("admirers", [])
+    if admirer:
+        users_collection.update_one({"_id": current_user["_id"]}, {"$pull": {"admirers": target_id}})
+    
     # Check for match if liked
     match = False
     match_id = None
     if action.action == "like":
-        reverse_swipe = swipes_collection.find_one({
+        # The index answers without a lookup; the swipe history covers likes it dropped or missed
+        reverse_swipe = admirer or swipes_collection.find_one({
             "user_id": target_id,
             "target_user_id": current_user["_id"],
             "action": "like"
         })
         
-        if reverse_swipe:
+        if not reverse_swipe:
+            # Pending like: index it on the target, newest last, capped
+            users_collection.update_one(
+                {"_id": target_id, "admirers": {"$ne": current_user["_id"]}},
+                {"$push": {"admirers": {"$each": [current_user["_id"]], "$slice": -ADMIRERS_MAX}}}
+            )
+        else:
             # It's a match!
             match_doc = {
                 "users": [current_user["_id"], target_id],
@@ -441,6 +922,7 @@ async def swipe(action: SwipeAction, current_user = Depends(get_current_user)):
             result = matches_collection.insert_one(match_doc)
             match = True
             match_id = str(result.inserted_id)
+            match_tips_pool.enqueue(result.inserted_id)
             
             # Create notification for both users
             target_user = users_collection.find_one({"_id": target_id})
@@ -469,40 +951,54 @@ async def swipe(action: SwipeAction, current_user = Depends(get_current_user)):
 
 # Matches Endpoints
 @app.get("/api/matches")
-async def get_matches(current_user = Depends(get_current_user)):
-    matches = matches_collection.find({"users": current_user["_id"]})
-    result = []
+async def get_matches(fields: Optional[str] = None, current_user = Depends(get_current_user)):
+    selected = fieldsets.FieldSet(fields, fieldsets.MATCH_FIELDS, fieldsets.MATCH_NESTED)
+    user_fields = selected.child("user")
+    matches = list(matches_collection.find({"users": current_user["_id"]}, selected.projection("users")))
+    if not matches:
+        return []
     
+    # One batched lookup for the other users and one for the last messages,
+    # instead of two queries per match; each skipped when not requested
+    other_ids = {m["_id"]: [u for u in m["users"] if u != current_user["_id"]][0] for m in matches}
+    other_users = {
+        u["_id"]: u
+        for u in users_collection.find({"_id": {"$in": list(other_ids.values())}}, user_fields.projection())
+    } if "user" in selected else {}
+    last_messages = chat_store.last_messages(list(other_ids)) if "last_message" in selected else {}
+    
+    result = []
     for m in matches:
-        other_user_id = [u for u in m["users"] if u != current_user["_id"]][0]
-        other_user = users_collection.find_one({"_id": other_user_id})
-        
-        last_msg = messages_collection.find_one(
-            {"match_id": m["_id"]},
-            sort=[("created_at", -1)]
-        )
+        other_user = other_users.get(other_ids[m["_id"]])
+        last_msg = last_messages.get(m["_id"])
         
-        result.append({
+        result.append(selected.apply({
             "id": str(m["_id"]),
-            "user": serialize_user(other_user) if other_user else None,
+            "user": user_fields.apply(serialize_user(other_user, image="thumb")) if other_user else None,
             "last_message": {
                 "content": last_msg["content"],
                 "created_at": last_msg["created_at"].isoformat(),
                 "sender_id": str(last_msg["sender_id"])
             } if last_msg else None,
-            "created_at": m["created_at"].isoformat()
-        })
+            "created_at": m["created_at"].isoformat() if m.get("created_at") else None
+        }))
     
     return result
 
 # Chat Endpoints
 @app.get("/api/chat/{match_id}")
-async def get_messages(match_id: str, current_user = Depends(get_current_user)):
+async def get_messages(
+    match_id: str,
+    limit: Optional[int] = Query(default=None, gt=0, le=200),
+    before: Optional[datetime] = None,
+    current_user = Depends(get_current_user)
+):
+    """Chat history, oldest first; with `limit`, the latest page before `before` (a created_at)"""
     match = matches_collection.find_one({"_id": ObjectId(match_id)})
     if not match or current_user["_id"] not in match["users"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    messages = messages_collection.find({"match_id": ObjectId(match_id)}).sort("created_at", 1)
+    messages = chat_store.page(ObjectId(match_id), limit, before)
     
     return [{
         "id": str(msg["_id"]),
@@ -512,7 +1008,7 @@ async def get_messages(match_id: str, current_user = Depends(get_current_user)):
         "created_at": msg["created_at"].isoformat()
     } for msg in messages]
 
-@app.post("/api/chat")
+@app.post("/api/chat", dependencies=[Depends(rate_limited("chat"))])
 async def send_message(msg: MessageCreate, current_user = Depends(get_current_user)):
     match = matches_collection.find_one({"_id": ObjectId(msg.match_id)})
     if not match or current_user["_id"] not in match["users"]:
@@ -524,7 +1020,7 @@ async def send_message(msg: MessageCreate, current_user = Depends(get_current_us
         "content": msg.content,
         "created_at": datetime.now(timezone.utc)
     }
-    result = messages_collection.insert_one(new_msg)
+    chat_store.append(new_msg)
     
     # Create notification for recipient
     other_user_id = [u for u in match["users"] if u != current_user["_id"]][0]
@@ -539,7 +1035,7 @@ async def send_message(msg: MessageCreate, current_user = Depends(get_current_us
     })
     
     return {
-        "id": str(result.inserted_id),
+        "id": str(new_msg["_id"]),
         "content": msg.content,
         "sender_id": str(current_user["_id"]),
         "is_mine": True,
@@ -551,24 +1047,26 @@ async def send_message(msg: MessageCreate, current_user = Depends(get_current_us
 async def get_notifications(
     unread_only: bool = False,
     limit: int = Query(default=20, le=100),
+    fields: Optional[str] = None,
     current_user = Depends(get_current_user)
 ):
     """Get user notifications"""
+    selected = fieldsets.FieldSet(fields, fieldsets.NOTIFICATION_FIELDS)
     query = {"user_id": current_user["_id"]}
     if unread_only:
         query["read"] = False
     
-    notifications = notifications_collection.find(query).sort("created_at", -1).limit(limit)
+    notifications = notifications_read_collection.find(query, selected.projection()).sort("created_at", -1).limit(limit)
     
-    return [{
+    return [selected.apply({
         "id": str(n["_id"]),
-        "type": n["type"],
-        "title": n["title"],
-        "body": n["body"],
+        "type": n.get("type"),
+        "title": n.get("title"),
+        "body": n.get("body"),
         "data": n.get("data", {}),
-        "read": n["read"],
-        "created_at": n["created_at"].isoformat()
-    } for n in notifications]
+        "read": n.get("read"),
+        "created_at": n["created_at"].isoformat() if n.get("created_at") else None
+    }) for n in notifications]
 
 @app.get("/api/notifications/unread-count")
 async def get_unread_count(current_user = Depends(get_current_user)):
@@ -597,8 +1095,62 @@ async def mark_all_notifications_read(current_user = Depends(get_current_user)):
     )
     return {"success": True}
 
+# Export Endpoint
+async def export_records(user: dict):
+    """The rider's profile, routes, matches, messages and notifications, one record at a time"""
+    yield {"type": "user", **serialize_user(user)}
+    
+    routes = routes_read_collection.find({"user_id": user["_id"]}).sort("created_at", 1)
+    async for route in export.iterate(routes, EXPORT_BATCH_SIZE):
+        yield {"type": "route", **serialize_route(route)}
+    
+    match_ids = []
+    matches = matches_collection.find({"users": user["_id"]}).sort("created_at", 1)
+    async for m in export.iterate(matches, EXPORT_BATCH_SIZE):
+        match_ids.append(m["_id"])
+        yield {
+            "type": "match",
+            "id": str(m["_id"]),
+            "user_id": str([u for u in m["users"] if u != user["_id"]][0]),
+            "created_at": m["created_at"].isoformat() if m.get("created_at") else None
+        }
+    
+    for match_id in match_ids:
+        async for msg in export.iterate(chat_store.history(match_id, EXPORT_BATCH_SIZE), EXPORT_BATCH_SIZE):
+            yield {
+                "type": "message",
+                "id": str(msg["_id"]),
+                "match_id": str(match_id),
+                "content": msg["content"],
+                "sender_id": str(msg["sender_id"]),
+                "is_mine": msg["sender_id"] == user["_id"],
+                "created_at": msg["created_at"].isoformat()
+            }
+    
+    notifications = notifications_read_collection.find({"user_id": user["_id"]}).sort("created_at", 1)
+    async for n in export.iterate(notifications, EXPORT_BATCH_SIZE):
+        yield {
+            "type": "notification",
+            "id": str(n["_id"]),
+            "notification_type": n.get("type"),
+            "title": n.get("title"),
+            "body": n.get("body"),
+            "data": n.get("data", {}),
+            "read": n.get("read"),
+            "created_at": n["created_at"].isoformat() if n.get("created_at") else None
+        }
+
+@app.get("/api/export", dependencies=[Depends(rate_limited("export"))])
+async def export_data(current_user = Depends(get_current_user)):
+    """All of the rider's data as NDJSON, streamed in constant memory (see export.py)"""
+    return StreamingResponse(
+        export.ndjson(export_records(current_user)),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="gravelmatch-export.ndjson"'}
+    )
+
 # AI Suggestions Endpoint
-@app.get("/api/ai/route-suggestions")
+@app.get("/api/ai/route-suggestions", dependencies=[Depends(rate_limited("ai"))])
 async def get_ai_route_suggestions(current_user = Depends(get_current_user)):
     from emergentintegrations.llm.chat import LlmChat, UserMessage
     
@@ -622,33 +1174,74 @@ async def get_ai_route_suggestions(current_user = Depends(get_current_user)):
     except Exception as e:
         return {"suggestions": f"Suggerimenti non disponibili al momento. Errore: {str(e)}"}
 
-@app.get("/api/ai/match-tips")
+@app.get("/api/ai/match-tips", dependencies=[Depends(rate_limited("ai"))])
 async def get_ai_match_tips(target_user_id: str, current_user = Depends(get_current_user)):
-    from emergentintegrations.llm.chat import LlmChat, UserMessage
-    
     target = users_collection.find_one({"_id": ObjectId(target_user_id)})
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # Serve precomputed tips while both profiles are unchanged
+    match = matches_collection.find_one({"users": {"$all": [current_user["_id"], target["_id"]]}})
+    fingerprint = match_tips_fingerprint(current_user, target)
+    cached = match.get("ai_tips") if match else None
+    if cached and cached.get("fingerprint") == fingerprint:
+        return {"tips": cached["text"]}
+    
     try:
-        chat = LlmChat(
-            api_key=os.environ.get("EMERGENT_LLM_KEY"),
-            session_id=f"match_tips_{str(current_user['_id'])}_{target_user_id}",
-            system_message="Sei un esperto di ciclismo e connessioni sociali. Suggerisci spunti di conversazione basati sui profili dei ciclisti. Rispondi in italiano, brevemente."
-        ).with_model("openai", "gpt-5.2")
-        
-        user_message = UserMessage(
-            text=f"Utente 1: livello {current_user.get('experience_level', 'N/A')}, distanza media {current_user.get('avg_distance', 'N/A')}km, zona {current_user.get('preferred_zone', 'N/A')}. Utente 2: livello {target.get('experience_level', 'N/A')}, distanza media {target.get('avg_distance', 'N/A')}km, zona {target.get('preferred_zone', 'N/A')}. Suggerisci 2 spunti di conversazione per rompere il ghiaccio."
-        )
-        
-        response = await chat.send_message(user_message)
+        response = await generate_match_tips(current_user, target)
+        if match:
+            store_match_tips(match["_id"], response, fingerprint)
         return {"tips": response}
     except Exception as e:
         return {"tips": f"Suggerimenti non disponibili. Errore: {str(e)}"}
 
+@app.get("/api/ai/match-tips/stats", dependencies=[Depends(require_admin)])
+async def get_match_tips_stats():
+    """Background tips generation backlog (workers, queue, wait times): X-Admin-Token only"""
+    return match_tips_pool.metrics()
+
+# Admin Endpoints
+@app.get("/api/admin/profile", dependencies=[Depends(require_admin)])
+async def get_profile(endpoint: Optional[str] = None, format: str = Query(default="collapsed", pattern="^(collapsed|json)$")):
+    """Download sampled stacks in collapsed (flamegraph) format, or per-endpoint sample counts"""
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler disabled")
+    if format == "json":
+        return sampling_profiler.summary()
+    return PlainTextResponse(
+        sampling_profiler.collapsed(endpoint),
+        headers={"Content-Disposition": 'attachment; filename="gravelmatch.folded"'}
+    )
+
+@app.delete("/api/admin/profile", dependencies=[Depends(require_admin)])
+async def reset_profile():
+    """Discard collected samples"""
+    sampling_profiler.reset()
+    return {"success": True}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return metrics.metrics_response()
+
+readiness = health.Readiness(
+    lambda: client.admin.command("ping"),
+    ttl=float(os.environ.get("HEALTH_CACHE_SECONDS", "5")),
+    timeout=float(os.environ.get("HEALTH_TIMEOUT_SECONDS", "2"))
+)
+
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "app": "GravelMatch API", "version": "2.0.0"}
+    """Readiness: MongoDB answers a (cached) ping and the worker is not draining; 503 otherwise"""
+    checks = await readiness.check()
+    return JSONResponse(
+        {"status": "healthy" if checks["ready"] else "unhealthy", "app": "GravelMatch API", "version": "2.0.0", **checks},
+        status_code=200 if checks["ready"] else 503
+    )
+
+@app.get("/api/health/live")
+async def liveness_check():
+    """Liveness: the process serves requests, whatever the state of its dependencies"""
+    return {"status": "alive"}
 
 if __name__ == "__main__":
     import uvicorn
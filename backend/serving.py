@@ -0,0 +1,46 @@
+"""Gunicorn worker with a drain period before shutdown (see gunicorn.conf.py).
+
+On the first SIGTERM/SIGINT the worker marks itself as draining, which fails
+the readiness probe, but keeps accepting and serving requests for
+DRAIN_SECONDS so load balancers have time to take it out of rotation. It
+then shuts down like a plain uvicorn worker: it stops accepting, waits for
+in-flight requests and runs the app's lifespan shutdown. A second signal
+skips the rest of the drain.
+"""
+import os
+import sys
+import time
+
+from gunicorn.arbiter import Arbiter
+from uvicorn.server import Server
+from uvicorn_worker import UvicornWorker
+
+import health
+
+
+class DrainingServer(Server):
+    def __init__(self, config, drain_seconds: float):
+        super().__init__(config)
+        self.drain_seconds = drain_seconds
+        self.drain_deadline = None
+
+    def handle_exit(self, sig, frame):
+        if self.drain_deadline is None and self.drain_seconds > 0:
+            health.DRAINING.set()
+            self.drain_deadline = time.monotonic() + self.drain_seconds
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        should_exit = await super().on_tick(counter)
+        return should_exit or (self.drain_deadline is not None and time.monotonic() >= self.drain_deadline)
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    async def _serve(self) -> None:
+        self.config.app = self.wsgi
+        server = DrainingServer(self.config, float(os.environ.get("DRAIN_SECONDS", "0")))
+        self._install_sigquit_handler()
+        await server.serve(sockets=self.sockets)
+        if not server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
@@ -0,0 +1,190 @@
+"""Request-scoped MongoDB query tracing and per-endpoint query budgets.
+
+Enabled with QUERY_TRACE=true. Every command issued while serving a request is
+recorded; the response carries X-Query-Count / X-Query-Time-Ms / X-Query-Budget
+headers and a log line summarizes the commands. With QUERY_BUDGET_ENFORCE=true a
+request exceeding its endpoint budget is answered with a 500 instead, which is
+what the budget test suite runs against.
+
+Counts are read when the response starts. For a streaming response
+(GET /api/export) that is before the body is produced, so the budget
+covers only the work done up front (auth). The queries issued while
+streaming are not counted, and the endpoint is effectively exempt.
+"""
+import json
+import logging
+import os
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from pymongo import monitoring
+
+from metrics import command_collection
+
+logger = logging.getLogger(__name__)
+
+# Maximum MongoDB commands per request, including the user lookup done by auth.
+# Keyed by "METHOD route-template"; override with QUERY_BUDGETS="GET /api/matches=5,..."
+DEFAULT_QUERY_BUDGETS = {
+    "POST /api/auth/register": 2,
+    "POST /api/auth/login": 3,
+    "GET /api/auth/me": 1,
+    "PUT /api/profile": 5,
+    "POST /api/upload/image": 1,
+    "POST /api/upload/profile-picture": 2,
+    "POST /api/routes": 4,
+    "GET /api/routes": 1,
+    "GET /api/routes/search": 2,
+    "GET /api/routes/{route_id}": 1,
+    "GET /api/routes/user/me": 3,
+    "POST /api/routes/{route_id}/like": 2,
+    "GET /api/discover": 5,
+    "POST /api/swipe": 6,
+    "GET /api/matches": 4,
+    "GET /api/chat/{match_id}": 4,
+    "POST /api/chat": 4,
+    "GET /api/notifications": 2,
+    "GET /api/notifications/unread-count": 2,
+    "PUT /api/notifications/{notification_id}/read": 2,
+    "PUT /api/notifications/read-all": 2,
+    # Streaming: only the auth lookup before the body is counted (see above)
+    "GET /api/export": 1,
+    "GET /api/ai/route-suggestions": 1,
+    "GET /api/ai/match-tips": 4,
+    "GET /api/ai/match-tips/stats": 0,
+    "GET /api/admin/profile": 0,
+    "DELETE /api/admin/profile": 0,
+    "GET /api/health": 1,
+    "GET /api/health/live": 0,
+    "GET /metrics": 0,
+}
+
+
+# Endpoints behind rate_limited(): the shared MongoDB limiter adds one findAndModify to each
+RATE_LIMITED_ENDPOINTS = [
+    "POST /api/routes/{route_id}/like",
+    "POST /api/swipe",
+    "POST /api/chat",
+    "GET /api/ai/route-suggestions",
+    "GET /api/ai/match-tips",
+    "GET /api/export",
+]
+
+
+def load_budgets(rate_limit_queries: int = 0) -> dict:
+    """Default budgets, plus `rate_limit_queries` on rate-limited endpoints, then QUERY_BUDGETS overrides"""
+    budgets = dict(DEFAULT_QUERY_BUDGETS)
+    for endpoint in RATE_LIMITED_ENDPOINTS:
+        budgets[endpoint] += rate_limit_queries
+    for item in os.environ.get("QUERY_BUDGETS", "").split(","):
+        if "=" in item:
+            endpoint, limit = item.rsplit("=", 1)
+            budgets[endpoint.strip()] = int(limit)
+    return budgets
+
+
+class QueryTrace:
+    def __init__(self):
+        self.commands = []
+
+    @property
+    def count(self) -> int:
+        return len(self.commands)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(duration for _, _, duration in self.commands)
+
+    def summary(self) -> str:
+        counts = Counter(f"{command}:{collection}" for command, collection, _ in self.commands)
+        return ", ".join(f"{name} x{n}" for name, n in counts.most_common())
+
+
+_current_trace: ContextVar[Optional[QueryTrace]] = ContextVar("query_trace", default=None)
+
+
+class QueryTraceListener(monitoring.CommandListener):
+    """Attributes commands to the request whose context issued them.
+
+    pymongo publishes command events synchronously on the calling thread, so the
+    context variable set by the middleware is visible here.
+    """
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        if _current_trace.get() is not None:
+            self._collections[(event.connection_id, event.request_id)] = command_collection(event)
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), None)
+        trace = _current_trace.get()
+        if trace is not None and collection is not None:
+            trace.commands.append((event.command_name, collection, event.duration_micros / 1000))
+
+
+class QueryTraceMiddleware:
+    def __init__(self, app, budgets: dict = None, enforce: bool = False):
+        self.app = app
+        self.budgets = budgets if budgets is not None else load_budgets()
+        self.enforce = enforce
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = QueryTrace()
+        token = _current_trace.set(trace)
+        swallow_body = False
+
+        async def send_wrapper(message):
+            nonlocal swallow_body
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                endpoint = f"{scope['method']} {route.path if route else scope['path']}"
+                budget = self.budgets.get(endpoint)
+                exceeded = budget is not None and trace.count > budget
+                logger.log(
+                    logging.WARNING if exceeded else logging.INFO,
+                    "%s: %d queries in %.1f ms (budget %s) [%s]",
+                    endpoint, trace.count, trace.total_ms, budget, trace.summary()
+                )
+                if exceeded and self.enforce:
+                    swallow_body = True
+                    body = json.dumps({
+                        "detail": f"Query budget exceeded for {endpoint}: {trace.count} > {budget}",
+                        "queries": trace.summary()
+                    }).encode()
+                    await send({
+                        "type": "http.response.start",
+                        "status": 500,
+                        "headers": [
+                            (b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                        ]
+                    })
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(trace.count).encode()))
+                headers.append((b"x-query-time-ms", f"{trace.total_ms:.2f}".encode()))
+                if budget is not None:
+                    headers.append((b"x-query-budget", str(budget).encode()))
+                message = {**message, "headers": headers}
+            elif swallow_body:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
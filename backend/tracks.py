@@ -0,0 +1,115 @@
+"""Route analytics derived from the waypoint track.
+
+Waypoints are `{"lat", "lng", "ele"?, "surface"?}` dicts. They are converted
+once into NumPy columns, and every statistic is computed over whole arrays:
+segment lengths (haversine), total ascent / descent, grades and per-surface
+distance. Ascent and grades are measured on the elevation profile smoothed
+over SMOOTHING_WINDOW_M and resampled every GRADE_STEP_M metres: summing raw
+point-to-point differences would count GPS noise as climbing. The grade
+histogram is weighted by distance.
+"""
+from typing import Optional
+
+import numpy as np
+
+import geo
+
+GRADE_STEP_M = 100.0
+SMOOTHING_WINDOW_M = 200.0
+# Grade histogram bin edges, percent; the outer bins are open-ended
+GRADE_BINS = [-10.0, -6.0, -3.0, -1.0, 1.0, 3.0, 6.0, 10.0, 15.0]
+
+
+class Track:
+    """Column-oriented view of a waypoint list; points without coordinates are dropped"""
+
+    def __init__(self, lat, lng, ele, surface, surface_names):
+        self.lat = lat
+        self.lng = lng
+        self.ele = ele
+        # Integer codes into surface_names ("" for unknown)
+        self.surface = surface
+        self.surface_names = surface_names
+
+    def __len__(self):
+        return len(self.lat)
+
+    @classmethod
+    def from_waypoints(cls, waypoints: list) -> "Track":
+        points = [w for w in waypoints or [] if w.get("lat") is not None and w.get("lng") is not None]
+        codes = {}
+        return cls(
+            lat=np.array([w["lat"] for w in points], dtype=float),
+            lng=np.array([w["lng"] for w in points], dtype=float),
+            ele=np.array([w.get("ele") for w in points], dtype=float),
+            surface=np.array([codes.setdefault(w.get("surface") or "", len(codes)) for w in points], dtype=np.intp),
+            surface_names=list(codes),
+        )
+
+
+def smooth(along_m: np.ndarray, values: np.ndarray, window_m: float) -> np.ndarray:
+    """Moving average over the points within window_m / 2 on either side"""
+    low = np.searchsorted(along_m, along_m - window_m / 2, side="left")
+    high = np.searchsorted(along_m, along_m + window_m / 2, side="right")
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    return (sums[high] - sums[low]) / (high - low)
+
+
+def grade_histogram(grades: np.ndarray, lengths_km: np.ndarray) -> list:
+    """Kilometres per grade bin"""
+    bins = np.digitize(grades, GRADE_BINS)
+    km = np.bincount(bins, weights=lengths_km, minlength=len(GRADE_BINS) + 1)
+    edges = [None, *GRADE_BINS, None]
+    return [{"min": edges[i], "max": edges[i + 1], "km": round(float(km[i]), 3)} for i in range(len(km))]
+
+
+def compute(track: Track) -> Optional[dict]:
+    """Route statistics, or None when the track has fewer than two points"""
+    if len(track) < 2:
+        return None
+
+    segments_km = geo.haversine_km(track.lat[:-1], track.lng[:-1], track.lat[1:], track.lng[1:])
+    distance_km = float(segments_km.sum())
+    stats = {
+        "distance_km": round(distance_km, 3),
+        "points": len(track),
+        "ascent_m": None,
+        "descent_m": None,
+        "min_ele": None,
+        "max_ele": None,
+        "max_grade": None,
+        "grade_histogram": [],
+        "surfaces": {},
+    }
+
+    has_ele = ~np.isnan(track.ele)
+    if has_ele.sum() >= 2:
+        # Elevation along the cumulative distance, gaps skipped
+        along_m = np.concatenate(([0.0], np.cumsum(segments_km) * 1000))[has_ele]
+        ele = track.ele[has_ele]
+        stats["min_ele"] = round(float(ele.min()), 1)
+        stats["max_ele"] = round(float(ele.max()), 1)
+
+        if along_m[-1] > 0:
+            if along_m[-1] > GRADE_STEP_M:
+                stations = np.append(np.arange(0.0, along_m[-1], GRADE_STEP_M), along_m[-1])
+            else:
+                stations = along_m[[0, -1]]
+            profile = np.interp(stations, along_m, smooth(along_m, ele, SMOOTHING_WINDOW_M))
+            climbs = np.diff(profile)
+            steps_m = np.diff(stations)
+            grades = np.divide(climbs * 100, steps_m, out=np.zeros(len(steps_m)), where=steps_m > 0)
+            stats["ascent_m"] = round(float(climbs[climbs > 0].sum()), 1)
+            stats["descent_m"] = round(float(-climbs[climbs < 0].sum()), 1)
+            stats["max_grade"] = round(float(grades.max()), 1)
+            stats["grade_histogram"] = grade_histogram(grades, steps_m / 1000)
+
+    # A segment takes the surface of its starting point
+    km = np.bincount(track.surface[:-1], weights=segments_km, minlength=len(track.surface_names))
+    stats["surfaces"] = {name: round(float(k), 3) for name, k in zip(track.surface_names, km) if name}
+
+    return stats
+
+
+def summarize(waypoints: list) -> Optional[dict]:
+    return compute(Track.from_waypoints(waypoints))
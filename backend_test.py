@@ -74,6 +74,16 @@ class GravelMatchAPITester:
             self.log_test(name, False, f"Request error: {str(e)}")
             return False, {}
 
+    def test_liveness(self):
+        """Test liveness probe"""
+        success, response = self.run_test(
+            "Liveness Probe",
+            "GET",
+            "api/health/live",
+            200
+        )
+        return success
+
     def test_health_check(self):
         """Test health endpoint"""
         success, response = self.run_test(
@@ -187,6 +197,61 @@ class GravelMatchAPITester:
             return True
         return False
 
+    def test_create_route_with_track(self):
+        """Test distance and stats derived from the waypoints"""
+        route_data = {
+            "title": "Test Track Route",
+            "difficulty": "easy",
+            "start_point": {"name": "Siena Centro", "lat": 43.3188, "lng": 11.3307},
+            # Three points 0.01° of latitude apart: about 2.2 km
+            "waypoints": [
+                # Extra keys, as imported from a GPX file, are kept
+                {"lat": 43.3188, "lng": 11.3307, "ele": 320, "time": "2026-05-01T08:00:00Z", "hr": 118},
+                {"lat": 43.3288, "lng": 11.3307, "ele": 340},
+                {"lat": 43.3388, "lng": 11.3307, "ele": 360}
+            ]
+        }
+        
+        self.track_route = route_data
+        success, response = self.run_test(
+            "Create Route With Track",
+            "POST",
+            "api/routes",
+            200,
+            data=route_data
+        )
+        
+        if success:
+            stats = response.get('stats') or {}
+            if abs((response.get('distance') or 0) - 2.2) > 0.1 or stats.get('points') != 3:
+                self.log_test("Route Track Stats", False,
+                              f"distance {response.get('distance')}, points {stats.get('points')}")
+                return False
+            first = (response.get('waypoints') or [{}])[0]
+            if first.get('time') != "2026-05-01T08:00:00Z" or first.get('hr') != 118:
+                self.log_test("Route Waypoint Extras", False, f"first waypoint {first}")
+                return False
+        return success
+
+    def test_create_route_invalid_waypoint(self):
+        """Test that a malformed waypoint is rejected"""
+        route_data = {
+            "title": "Bad Track Route",
+            "distance": 10,
+            "difficulty": "easy",
+            "start_point": {"lat": 43.3188, "lng": 11.3307},
+            "waypoints": [{"lat": "x", "lng": 1}]
+        }
+        
+        success, response = self.run_test(
+            "Create Route Invalid Waypoint",
+            "POST",
+            "api/routes",
+            422,
+            data=route_data
+        )
+        return success
+
     def test_get_routes(self):
         """Test get routes list"""
         success, response = self.run_test(
@@ -197,6 +262,104 @@ class GravelMatchAPITester:
         )
         return success
 
+    def test_duplicate_routes(self):
+        """Test that a re-uploaded track is linked to the original and hidden from listings"""
+        if not hasattr(self, 'track_route'):
+            self.log_test("Duplicate Route", False, "No track route available")
+            return False
+        
+        success, response = self.run_test(
+            "Create Duplicate Route",
+            "POST",
+            "api/routes",
+            200,
+            data=self.track_route
+        )
+        if not success:
+            return False
+        if not response.get('duplicate_of'):
+            self.log_test("Duplicate Route Linked", False, "duplicate_of not set")
+            return False
+        
+        duplicate_id = response['id']
+        success1, listed = self.run_test("Get Routes Without Duplicates", "GET", "api/routes", 200)
+        success2, listed_all = self.run_test(
+            "Get Routes Including Duplicates",
+            "GET",
+            "api/routes?include_duplicates=true",
+            200
+        )
+        if success1 and success2:
+            if duplicate_id in [r['id'] for r in listed] or duplicate_id not in [r['id'] for r in listed_all]:
+                self.log_test("Duplicate Route Hidden", False, "include_duplicates does not toggle the duplicate")
+                return False
+        return success1 and success2
+
+    def test_search_routes(self):
+        """Test full-text route search with tag facets"""
+        success1, response1 = self.run_test(
+            "Search Routes - Text",
+            "GET",
+            "api/routes/search?q=gravel",
+            200
+        )
+        if success1 and not ('results' in response1 and 'facets' in response1):
+            self.log_test("Search Routes - Response Shape", False, "Missing results or facets")
+            success1 = False
+        
+        success2, response2 = self.run_test(
+            "Search Routes - Tag Filter",
+            "GET",
+            "api/routes/search?tags=Panoramico&difficulty=moderate",
+            200
+        )
+        return success1 and success2
+
+    def test_sparse_fields(self):
+        """Test fields= selection and its validation"""
+        success1, response1 = self.run_test(
+            "Get Routes - Sparse Fields",
+            "GET",
+            "api/routes?fields=id,title",
+            200
+        )
+        if success1 and any(set(r) - {'id', 'title'} for r in response1):
+            self.log_test("Sparse Fields - Only Requested", False, "Unrequested fields returned")
+            success1 = False
+        
+        success2, response2 = self.run_test(
+            "Get Routes - Unknown Field",
+            "GET",
+            "api/routes?fields=id,not_a_field",
+            400
+        )
+        return success1 and success2
+
+    def test_compression(self):
+        """Test Accept-Encoding negotiation, including refusals with q=0"""
+        url = f"{self.base_url}/api/routes"
+        headers = {'Authorization': f'Bearer {self.token}'}
+        try:
+            # Raw headers: requests would otherwise decode the body transparently
+            gzip_response = requests.get(url, headers={**headers, 'Accept-Encoding': 'br;q=0, gzip'},
+                                         timeout=10, stream=True)
+            refused = requests.get(url, headers={**headers, 'Accept-Encoding': 'gzip;q=0, br;q=0'},
+                                   timeout=10, stream=True)
+        except Exception as e:
+            self.log_test("Compression", False, f"Request error: {str(e)}")
+            return False
+        
+        encoding = gzip_response.headers.get('Content-Encoding')
+        if encoding not in ('gzip', None):
+            self.log_test("Compression", False, f"Expected gzip with br;q=0, got {encoding}")
+            return False
+        if refused.headers.get('Content-Encoding'):
+            self.log_test("Compression", False,
+                          f"Got {refused.headers['Content-Encoding']} with every encoding at q=0")
+            return False
+        self.log_test("Compression", True)
+        return True
+
     def test_get_route_detail(self):
         """Test get specific route"""
         if hasattr(self, 'route_id'):
@@ -225,6 +388,33 @@ class GravelMatchAPITester:
             self.log_test("Like Route", False, "No route ID available")
             return False
 
+    def test_rate_limit(self):
+        """Test that a burst of likes is cut off with 429 and Retry-After"""
+        if not hasattr(self, 'route_id'):
+            self.log_test("Rate Limit", False, "No route ID available")
+            return False
+        
+        url = f"{self.base_url}/api/routes/{self.route_id}/like"
+        headers = {'Authorization': f'Bearer {self.token}'}
+        try:
+            # Default like bucket: bursts of 20
+            for _ in range(40):
+                response = requests.post(url, headers=headers, timeout=10)
+                if response.status_code != 200:
+                    break
+        except Exception as e:
+            self.log_test("Rate Limit", False, f"Request error: {str(e)}")
+            return False
+        
+        if response.status_code != 429:
+            self.log_test("Rate Limit", False, f"Expected 429 within 40 likes, got {response.status_code}")
+            return False
+        if not response.headers.get('Retry-After', '').isdigit():
+            self.log_test("Rate Limit", False, "429 without a Retry-After header")
+            return False
+        self.log_test("Rate Limit", True)
+        return True
+
     def test_discover_users(self):
         """Test user discovery"""
         success, response = self.run_test(
@@ -279,6 +469,31 @@ class GravelMatchAPITester:
         
         return success1 and success2 and success3 and success4 and success5
 
+    def test_discover_nearby(self):
+        """Test radius and distance-sorted discovery (profile located from preferred_zone)"""
+        success1, response1 = self.run_test(
+            "Discover Users - Within Radius",
+            "GET",
+            "api/discover?within_km=150",
+            200
+        )
+        if success1 and any((u.get('distance_km') or 0) > 150 for u in response1):
+            self.log_test("Discover Users - Radius Respected", False, "Rider outside within_km returned")
+            success1 = False
+        
+        success2, response2 = self.run_test(
+            "Discover Users - Sort By Distance",
+            "GET",
+            "api/discover?sort=distance",
+            200
+        )
+        if success2:
+            distances = [u['distance_km'] for u in response2 if u.get('distance_km') is not None]
+            if distances != sorted(distances):
+                self.log_test("Discover Users - Nearest First", False, "Results not sorted by distance")
+                success2 = False
+        return success1 and success2
+
     def test_get_matches(self):
         """Test get matches"""
         success, response = self.run_test(
@@ -317,6 +532,22 @@ class GravelMatchAPITester:
         
         return success1 and success2 and success3
 
+    def test_export(self):
+        """Test data export (NDJSON, one record per line)"""
+        success, response = self.run_test(
+            "Export Data",
+            "GET",
+            "api/export",
+            200
+        )
+        if success:
+            # A single-record export parses as plain JSON
+            records = [response] if isinstance(response, dict) else [json.loads(line) for line in response.splitlines()]
+            if not records or records[0].get("type") != "user":
+                self.log_test("Export Starts With Profile", False, "First record is not the user profile")
+                return False
+        return success
+
     def test_image_upload_endpoints(self):
         """Test image upload endpoints (without actual file)"""
         # Test image upload endpoint exists (will fail without file, but should return proper error)
@@ -383,17 +614,27 @@ def main():
     # Test sequence
     tests = [
         ("Health Check", tester.test_health_check),
+        ("Liveness Probe", tester.test_liveness),
         ("User Registration", tester.test_register),
         ("Get Profile", tester.test_get_profile),
         ("Update Profile", tester.test_update_profile),
         ("Create Route", tester.test_create_route),
+        ("Create Route With Track", tester.test_create_route_with_track),
+        ("Create Route Invalid Waypoint", tester.test_create_route_invalid_waypoint),
+        ("Duplicate Routes", tester.test_duplicate_routes),
         ("Get Routes", tester.test_get_routes),
+        ("Search Routes", tester.test_search_routes),
+        ("Sparse Fields", tester.test_sparse_fields),
+        ("Compression", tester.test_compression),
         ("Get Route Detail", tester.test_get_route_detail),
         ("Like Route", tester.test_like_route),
+        ("Rate Limit", tester.test_rate_limit),
         ("Discover Users", tester.test_discover_users),
         ("Discover with Filters", tester.test_discover_with_filters),
+        ("Discover Nearby", tester.test_discover_nearby),
         ("Get Matches", tester.test_get_matches),
         ("Notifications System", tester.test_notifications),
+        ("Export Data", tester.test_export),
         ("Image Upload Endpoints", tester.test_image_upload_endpoints),
         ("AI Route Suggestions", tester.test_ai_route_suggestions),
         ("Invalid Endpoint", tester.test_invalid_endpoints),
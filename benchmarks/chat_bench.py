@@ -0,0 +1,102 @@
+"""Chat storage engines: write / read latency and storage + index size.
+
+    python benchmarks/chat_bench.py --matches 2000 --messages 500000 --bucket-size 100
+
+Fills a scratch database with the same skewed conversations through each
+engine of backend/chat.py (one document per message vs per-match buckets),
+then reads random history pages and reports p50/p95 latency, documents
+returned per page and collection / index sizes from collStats.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+from common import BACKEND_DIR, summarize, write_report
+
+sys.path.insert(0, BACKEND_DIR)
+import chat  # noqa: E402
+
+
+def conversations(rng, matches: int, messages: int):
+    """(match_id, created_at) in time order, a few long conversations and many short ones"""
+    match_ids = [ObjectId() for _ in range(matches)]
+    weights = [1 / (rank + 1) for rank in range(matches)]
+    start = datetime.now(timezone.utc) - timedelta(days=180)
+    for i, match_id in enumerate(rng.choices(match_ids, weights=weights, k=messages)):
+        yield match_id, start + timedelta(seconds=i * 10)
+
+
+def run_engine(db, engine: str, args) -> dict:
+    store = chat.make_store(db, engine, args.bucket_size)
+    store.collection.drop()
+    store.ensure_indexes()
+    rng = random.Random(args.seed)
+    senders = [ObjectId() for _ in range(2)]
+
+    write_ms, match_ids = [], set()
+    for match_id, created_at in conversations(rng, args.matches, args.messages):
+        match_ids.add(match_id)
+        message = {"match_id": match_id, "sender_id": rng.choice(senders), "content": "Giro domenica mattina?",
+                   "created_at": created_at}
+        started = time.perf_counter()
+        store.append(message)
+        write_ms.append((time.perf_counter() - started) * 1000)
+
+    read_ms = []
+    match_ids = sorted(match_ids)
+    # Server-wide counter: meaningful on an otherwise idle local instance
+    returned_before = db.command("serverStatus")["metrics"]["document"]["returned"]
+    for _ in range(args.reads):
+        match_id = rng.choice(match_ids)
+        started = time.perf_counter()
+        store.page(match_id, args.page_size)
+        read_ms.append((time.perf_counter() - started) * 1000)
+    returned = db.command("serverStatus")["metrics"]["document"]["returned"] - returned_before
+    profile = db.command("collStats", store.collection.name)
+
+    return {
+        "write": summarize(write_ms),
+        "read": summarize(read_ms),
+        "documents": profile["count"],
+        "size_mb": round(profile["size"] / 2**20, 2),
+        "storage_mb": round(profile["storageSize"] / 2**20, 2),
+        "index_mb": round(profile["totalIndexSize"] / 2**20, 2),
+        "docs_per_page": round(returned / args.reads, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="gravelmatch_chat_bench")
+    parser.add_argument("--matches", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=500000)
+    parser.add_argument("--bucket-size", type=int, default=chat.DEFAULT_BUCKET_SIZE)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_url)[args.db]
+    report = {"matches": args.matches, "messages": args.messages, "bucket_size": args.bucket_size, "engines": {}}
+    print(f"{args.messages} messages over {args.matches} matches, pages of {args.page_size}")
+    for engine in ("documents", "buckets"):
+        r = report["engines"][engine] = run_engine(db, engine, args)
+        print(f"  {engine:<10} write p50 {r['write']['p50_ms']:6.2f} ms p95 {r['write']['p95_ms']:6.2f} ms  "
+              f"read p50 {r['read']['p50_ms']:6.2f} ms p95 {r['read']['p95_ms']:6.2f} ms  "
+              f"{r['documents']:>8} docs  data {r['size_mb']} MB  index {r['index_mb']} MB  "
+              f"{r['docs_per_page']} docs/page")
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Shared helpers for the GravelMatch benchmark scripts"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, env: dict = None, args: list = None) -> subprocess.Popen:
+    """Start the backend with uvicorn in a child process"""
+    cmd = args or [
+        sys.executable, "-m", "uvicorn", "server:app",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+    ]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env={**os.environ, **(env or {})})
+
+
+def wait_until_ready(base_url: str, path: str = "/api/health/live", timeout: float = 60.0) -> float:
+    """Poll until the endpoint answers 200, returning the seconds waited"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(f"{base_url}{path}", timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{base_url}{path} not ready after {timeout}s")
+
+
+def stop_server(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies_ms: list) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        "count": len(values),
+        "mean_ms": round(statistics.fmean(values), 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def write_report(path: str, report: dict):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Report written to {path}")
+
+
+async def drive(client, path: str, concurrency: int, duration: float, headers: dict = None) -> list:
+    """Hit one endpoint from `concurrency` workers for `duration` seconds, returning latencies in ms"""
+    import asyncio
+
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
@@ -0,0 +1,105 @@
+"""Near-duplicate route lookup on a seeded database (see seed.py).
+
+    python benchmarks/seed.py --users 100000 --routes 1000000 --duplicate-rate 0.1 --drop
+    python benchmarks/dedup_bench.py --queries 500
+
+For random seeded routes, uploads a noisy (and half the time reversed) copy
+through the same path as create_route: fingerprint the track, look up the
+band index, compare signatures. Reports fingerprint and lookup latency, the
+index keys / documents examined, recall (the copy is linked to the route's
+first upload) and the false-positive rate on fresh random tracks.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from pymongo import MongoClient
+
+from common import BACKEND_DIR, summarize, write_report
+
+sys.path.insert(0, BACKEND_DIR)
+import fingerprints  # noqa: E402
+import tracks  # noqa: E402
+
+
+def noisy_copy(rng, waypoints: list) -> list:
+    source = waypoints[::-1] if rng.random() < 0.5 else waypoints
+    return [{"lat": w["lat"] + rng.uniform(-0.0003, 0.0003), "lng": w["lng"] + rng.uniform(-0.0003, 0.0003)} for w in source]
+
+
+def random_track(rng, lat: float, lng: float) -> list:
+    waypoints = []
+    for _ in range(rng.randint(5, 40)):
+        lat += rng.uniform(-0.01, 0.01)
+        lng += rng.uniform(-0.01, 0.01)
+        waypoints.append({"lat": lat, "lng": lng})
+    return waypoints
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="gravelmatch_bench")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=9)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    routes = MongoClient(args.mongo_url)[args.db]["routes"]
+    routes.create_index("fingerprint.bands")
+    total = routes.estimated_document_count()
+    samples = list(routes.aggregate([
+        {"$match": {"fingerprint": {"$ne": None}}},
+        {"$sample": {"size": args.queries}},
+        {"$project": {"waypoints": 1, "duplicate_of": 1}},
+    ]))
+    rng = random.Random(args.seed)
+
+    fingerprint_ms, lookup_ms, keys, docs = [], [], [], []
+    found = false_positives = fresh = 0
+    for route in samples:
+        for kind, waypoints in (("copy", noisy_copy(rng, route["waypoints"])),
+                                ("fresh", random_track(rng, route["waypoints"][0]["lat"], route["waypoints"][0]["lng"]))):
+            started = time.perf_counter()
+            track = tracks.Track.from_waypoints(waypoints)
+            fingerprint = fingerprints.compute(track.lat, track.lng)
+            fingerprint_ms.append((time.perf_counter() - started) * 1000)
+            if fingerprint is None:
+                continue
+            started = time.perf_counter()
+            duplicate = fingerprints.find_duplicate(routes, fingerprint)
+            lookup_ms.append((time.perf_counter() - started) * 1000)
+            stats = routes.find({"fingerprint.bands": {"$in": fingerprint["bands"]}}).limit(
+                fingerprints.MAX_CANDIDATES).explain()["executionStats"]
+            keys.append(stats["totalKeysExamined"])
+            docs.append(stats["totalDocsExamined"])
+            if kind == "copy":
+                found += bool(duplicate) and duplicate[0] == (route.get("duplicate_of") or route["_id"])
+            else:
+                fresh += 1
+                false_positives += bool(duplicate)
+
+    report = {
+        "routes": total,
+        "queries": len(samples),
+        "fingerprint": summarize(fingerprint_ms),
+        "lookup": summarize(lookup_ms),
+        "avg_keys_examined": round(sum(keys) / len(keys), 1) if keys else 0,
+        "avg_docs_examined": round(sum(docs) / len(docs), 1) if docs else 0,
+        "recall": round(found / len(samples), 3) if samples else 0,
+        "false_positive_rate": round(false_positives / fresh, 3) if fresh else 0,
+    }
+    print(f"{total} routes, {len(samples)} queries")
+    for name in ("fingerprint", "lookup"):
+        print(f"  {name:<12} p50 {report[name]['p50_ms']:7.2f} ms  p95 {report[name]['p95_ms']:7.2f} ms")
+    print(f"  examined     {report['avg_keys_examined']} keys, {report['avg_docs_examined']} docs per lookup")
+    print(f"  recall {report['recall']:.1%}, false positives {report['false_positive_rate']:.1%}")
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Streaming data export: throughput and server peak RSS against history size.
+
+    python benchmarks/export_bench.py --messages 1000000 --batch-sizes 100,500,2000
+
+Seeds a scratch database with one rider holding `--messages` chat messages
+over `--matches` skewed conversations (plus routes and notifications), in
+both chat layouts of backend/chat.py. Then, for each engine and
+EXPORT_BATCH_SIZE, starts a fresh backend, downloads GET /api/export and
+reports records, MB, time to first byte, MB/s and the server's peak RSS
+(VmHWM, Linux only) above its idle RSS. `--materialized` adds a run that
+loads the longest conversation in one GET /api/chat/{match_id}, for
+comparison with a response built in memory.
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from bson import ObjectId
+from passlib.context import CryptContext
+from pymongo import MongoClient
+
+from common import BACKEND_DIR, free_port, start_server, stop_server, wait_until_ready, write_report
+from seed import BENCH_PASSWORD, EMAIL_TEMPLATE, PHRASES, batched, insert
+
+sys.path.insert(0, BACKEND_DIR)
+import chat  # noqa: E402
+
+
+def proc_status_kb(pid: int, field: str) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def conversation(rng, match: dict, count: int, start: datetime):
+    """`count` messages of one match, oldest first"""
+    created_at = start
+    for _ in range(count):
+        created_at += timedelta(seconds=rng.randint(1, 600))
+        yield {
+            "_id": ObjectId(),
+            "match_id": match["_id"],
+            "sender_id": rng.choice(match["users"]),
+            "content": rng.choice(PHRASES),
+            "created_at": created_at,
+        }
+
+
+def buckets(messages, bucket_size: int):
+    for seq, batch in enumerate(batched(messages, bucket_size)):
+        yield {
+            "match_id": batch[0]["match_id"],
+            "seq": seq,
+            "count": len(batch),
+            "first_at": batch[0]["created_at"],
+            "last_at": batch[-1]["created_at"],
+            "messages": [{k: m[k] for k in ("_id", "sender_id", "content", "created_at")} for m in batch],
+        }
+
+
+def populate(db, args) -> ObjectId:
+    """Insert the rider's data in both chat layouts; returns the longest conversation"""
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=365)
+    password_hash = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(BENCH_PASSWORD)
+    rider = {"_id": ObjectId(), "email": EMAIL_TEMPLATE.format(0), "password": password_hash, "name": "Export",
+             "profile_completed": True, "created_at": start}
+    partners = [{"_id": ObjectId(), "email": EMAIL_TEMPLATE.format(i + 1), "password": password_hash,
+                 "name": f"Partner {i}", "created_at": start} for i in range(args.matches)]
+    matches = [{"_id": ObjectId(), "users": [rider["_id"], p["_id"]], "created_at": start} for p in partners]
+    insert(db["users"], [rider, *partners], args.insert_batch)
+    insert(db["matches"], matches, args.insert_batch)
+    insert(db["routes"], ({
+        "user_id": rider["_id"], "user_name": rider["name"], "title": f"Giro {i}", "distance": 60.0,
+        "elevation": 800, "difficulty": "moderate", "start_point": {"lat": 43.3, "lng": 11.3},
+        "waypoints": [], "tags": ["Sterrato"], "likes": 0, "created_at": start + timedelta(days=i),
+    } for i in range(args.routes)), args.insert_batch)
+    insert(db["notifications"], ({
+        "user_id": rider["_id"], "type": "message", "title": "Nuovo messaggio", "body": rng.choice(PHRASES),
+        "data": {}, "read": True, "created_at": start + timedelta(minutes=i),
+    } for i in range(args.notifications)), args.insert_batch)
+
+    # Skewed: a few long conversations, many short ones
+    weights = [1 / (rank + 1) for rank in range(len(matches))]
+    counts = Counter(m["_id"] for m in rng.choices(matches, weights=weights, k=args.messages))
+    for engine in ("documents", "buckets"):
+        store = chat.make_store(db, engine, args.bucket_size)
+        store.ensure_indexes()
+        convo_rng = random.Random(args.seed)
+        per_match = [conversation(convo_rng, m, counts[m["_id"]], start) for m in matches]
+        documents = per_match if engine == "documents" else [buckets(c, args.bucket_size) for c in per_match]
+        insert(store.collection, itertools.chain.from_iterable(documents), args.insert_batch)
+    return counts.most_common(1)[0][0]
+
+
+def login(client) -> dict:
+    response = client.post("/api/auth/login", json={"email": EMAIL_TEMPLATE.format(0), "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}", "Accept-Encoding": "identity"}
+
+
+def measure(args, engine: str, batch_size: int, path: str = "/api/export") -> dict:
+    port = free_port()
+    proc = start_server(port, env={
+        "MONGO_URL": args.mongo_url, "DB_NAME": args.db, "CHAT_STORAGE": engine,
+        "CHAT_BUCKET_SIZE": str(args.bucket_size), "EXPORT_BATCH_SIZE": str(batch_size),
+        "RATE_LIMIT_ENABLED": "false", "SECRET_KEY": os.environ.get("SECRET_KEY", "export-bench"),
+    })
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url)
+        with httpx.Client(base_url=base_url, timeout=600) as client:
+            headers = login(client)
+            idle_kb = proc_status_kb(proc.pid, "VmRSS")
+            records = size = 0
+            first_byte = None
+            started = time.perf_counter()
+            with client.stream("GET", path, headers=headers) as response:
+                response.raise_for_status()
+                for chunk in response.iter_raw():
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - started
+                    records += chunk.count(b"\n")
+                    size += len(chunk)
+            seconds = time.perf_counter() - started
+        peak_kb = proc_status_kb(proc.pid, "VmHWM")
+    finally:
+        stop_server(proc)
+    return {
+        "records": records,
+        "mb": round(size / 2**20, 1),
+        "seconds": round(seconds, 2),
+        "first_byte_ms": round(first_byte * 1000, 1),
+        "mb_per_s": round(size / 2**20 / seconds, 1),
+        "idle_rss_mb": round(idle_kb / 1024, 1),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "rss_growth_mb": round((peak_kb - idle_kb) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="gravelmatch_export_bench")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--matches", type=int, default=200)
+    parser.add_argument("--routes", type=int, default=500)
+    parser.add_argument("--notifications", type=int, default=20_000)
+    parser.add_argument("--bucket-size", type=int, default=chat.DEFAULT_BUCKET_SIZE)
+    parser.add_argument("--engines", default="documents,buckets")
+    parser.add_argument("--batch-sizes", default="100,500,2000")
+    parser.add_argument("--materialized", action="store_true", help="also load the longest chat in one response")
+    parser.add_argument("--insert-batch", type=int, default=10_000)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the database of a previous run")
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo_url)
+    if args.skip_seed:
+        longest = client[args.db]["messages"].aggregate([
+            {"$sortByCount": "$match_id"}, {"$limit": 1}
+        ]).next()["_id"]
+    else:
+        client.drop_database(args.db)
+        print(f"Seeding {args.db}: {args.messages} messages over {args.matches} matches")
+        longest = populate(client[args.db], args)
+
+    report = {"messages": args.messages, "matches": args.matches, "runs": {}}
+    for engine in args.engines.split(","):
+        for batch_size in (int(n) for n in args.batch_sizes.split(",")):
+            r = report["runs"][f"{engine}/export/{batch_size}"] = measure(args, engine, batch_size)
+            print(f"  {engine:<10} batch {batch_size:>5}  {r['records']:>8} records {r['mb']:>7} MB "
+                  f"in {r['seconds']:6.1f}s ({r['mb_per_s']} MB/s, first byte {r['first_byte_ms']} ms)  "
+                  f"peak RSS {r['peak_rss_mb']} MB (+{r['rss_growth_mb']} MB over idle)")
+        if args.materialized:
+            r = report["runs"][f"{engine}/chat"] = measure(args, engine, 500, f"/api/chat/{longest}")
+            print(f"  {engine:<10} GET /api/chat (one response, {r['mb']} MB)  "
+                  f"peak RSS {r['peak_rss_mb']} MB (+{r['rss_growth_mb']} MB over idle)")
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Proximity discovery queries on a seeded database (see seed.py).
+
+    python benchmarks/seed.py --users 1000000 --drop
+    python benchmarks/geo_bench.py --queries 200 --radius-km 50
+
+Compares, for random riders, the old exact-zone filter with the 2dsphere-backed
+radius filter and nearest-first ordering used by /api/discover, reporting
+latency percentiles and the keys/documents examined by each plan.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from pymongo import MongoClient
+
+from common import BACKEND_DIR, summarize, write_report
+
+sys.path.insert(0, BACKEND_DIR)
+import geo  # noqa: E402
+
+POOL = 2000
+PAGE = 20
+
+
+def queries(user: dict, radius_km: float) -> dict:
+    base = {"_id": {"$ne": user["_id"]}, "profile_completed": True}
+    return {
+        "zone_equality": ({**base, "preferred_zone": user["preferred_zone"]}, POOL),
+        "geo_within": ({**base, "geo": {"$geoWithin": {
+            "$centerSphere": [user["geo"]["coordinates"], radius_km / geo.EARTH_RADIUS_KM]
+        }}}, POOL),
+        "near_sphere": ({**base, "geo": {"$nearSphere": {
+            "$geometry": user["geo"], "$maxDistance": radius_km * 1000
+        }}}, PAGE),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="gravelmatch_bench")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius-km", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    users = MongoClient(args.mongo_url)[args.db]["users"]
+    users.create_index([("geo", "2dsphere")])
+    total = users.estimated_document_count()
+    riders = list(users.aggregate([
+        {"$match": {"geo": {"$exists": True}}},
+        {"$sample": {"size": args.queries}},
+        {"$project": {"geo": 1, "preferred_zone": 1}},
+    ]))
+    random.Random(args.seed).shuffle(riders)
+
+    latencies = {}
+    returned = {}
+    for rider in riders:
+        for name, (query, limit) in queries(rider, args.radius_km).items():
+            started = time.perf_counter()
+            docs = list(users.find(query, {"_id": 1}).limit(limit))
+            latencies.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+            returned.setdefault(name, []).append(len(docs))
+
+    report = {"users": total, "queries": len(riders), "radius_km": args.radius_km, "results": {}}
+    print(f"{total} users, {len(riders)} riders, radius {args.radius_km} km")
+    for name, values in latencies.items():
+        query, limit = queries(riders[0], args.radius_km)[name]
+        stats = users.find(query, {"_id": 1}).limit(limit).explain()["executionStats"]
+        report["results"][name] = {
+            **summarize(values),
+            "avg_returned": round(sum(returned[name]) / len(returned[name]), 1),
+            "keys_examined": stats["totalKeysExamined"],
+            "docs_examined": stats["totalDocsExamined"],
+        }
+        r = report["results"][name]
+        print(f"  {name:<14} p50 {r['p50_ms']:7.2f} ms  p95 {r['p95_ms']:7.2f} ms  returned {r['avg_returned']:7.1f}  "
+              f"keys {r['keys_examined']:>8}  docs {r['docs_examined']:>8}")
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
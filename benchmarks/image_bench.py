@@ -0,0 +1,92 @@
+"""Image bytes per page with and without responsive variants.
+
+    python benchmarks/image_bench.py [--photos 20] [--width 4000 --height 3000]
+
+Runs synthetic camera photos through the local image backend
+(images.LocalStore, no Cloudinary needed) and reports the size of each
+variant, the render time per upload and the image bytes a client downloads
+for a page of discover cards, route list entries and match avatars: with
+the variant each view uses now, and with the full picture as before.
+"""
+import argparse
+import io
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from common import BACKEND_DIR, summarize, write_report
+
+sys.path.insert(0, BACKEND_DIR)
+import images  # noqa: E402
+
+# Items per page and the variant each view serves
+PAGES = {
+    "discover": (20, images.PROFILE_VARIANTS, "card"),
+    "routes": (20, images.ROUTE_VARIANTS, "card"),
+    "matches": (50, images.PROFILE_VARIANTS, "thumb"),
+}
+
+
+def synthetic_photo(rng: np.random.Generator, width: int, height: int) -> bytes:
+    """Smooth shapes plus sensor noise, JPEG-encoded like a phone upload"""
+    base = rng.integers(0, 256, (height // 100 + 2, width // 100 + 2, 3), dtype=np.uint8)
+    image = Image.fromarray(base).resize((width, height), Image.Resampling.BICUBIC)
+    pixels = np.asarray(image, dtype=np.int16) + rng.normal(0, 6, (height, width, 3)).astype(np.int16)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=20)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=17)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    photos = [synthetic_photo(rng, args.width, args.height) for _ in range(args.photos)]
+    report = {"photos": args.photos, "upload_kb": round(sum(map(len, photos)) / len(photos) / 1024, 1), "kinds": {}}
+    print(f"{args.photos} photos {args.width}x{args.height}, {report['upload_kb']} KB each")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = images.LocalStore(directory, "/uploads")
+        for kind, variants in (("profile", images.PROFILE_VARIANTS), ("route", images.ROUTE_VARIANTS)):
+            render_ms, sizes = [], {name: [] for name in variants}
+            for photo in photos:
+                started = time.perf_counter()
+                rendered, _ = store.render(photo, variants)
+                render_ms.append((time.perf_counter() - started) * 1000)
+                for name, (data, _, _) in rendered.items():
+                    sizes[name].append(len(data))
+            r = report["kinds"][kind] = {
+                "render": summarize(render_ms),
+                "variant_kb": {name: round(sum(s) / len(s) / 1024, 1) for name, s in sizes.items()},
+            }
+            variant_sizes = ", ".join(f"{name} {kb} KB" for name, kb in r["variant_kb"].items())
+            print(f"  {kind:<8} render p50 {r['render']['p50_ms']:7.1f} ms  p95 {r['render']['p95_ms']:7.1f} ms  "
+                  f"{variant_sizes}")
+
+    report["pages"] = {}
+    for page, (items, variants, variant) in PAGES.items():
+        kb = report["kinds"]["profile" if variants is images.PROFILE_VARIANTS else "route"]["variant_kb"]
+        p = report["pages"][page] = {
+            "items": items,
+            "variant": variant,
+            "kb": round(items * kb[variant], 1),
+            "full_kb": round(items * kb["full"], 1),
+        }
+        print(f"  {page:<8} {items} x {variant:<5} {p['kb']:8.1f} KB per page  (full pictures {p['full_kb']:8.1f} KB, "
+              f"-{1 - p['kb'] / p['full_kb']:.0%})")
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
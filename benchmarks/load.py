@@ -0,0 +1,239 @@
+"""Concurrent load test against a backend serving a seeded database.
+
+    python benchmarks/load.py run --base-url http://localhost:8001 --users 10000 \\
+        --clients 50 --duration 60 --json results/$(git rev-parse --short HEAD).json
+    python benchmarks/load.py compare results/base.json results/head.json
+
+Each client logs in as a random seeded rider (see seed.py) and loops over a
+weighted mix of register, discover, swipe, matches, chat and routes requests.
+The report holds throughput, errors and p50/p95/p99 latency per endpoint.
+`compare` prints the deltas between two reports and exits 1 on regressions.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from common import summarize, write_report
+from seed import BENCH_PASSWORD, EMAIL_TEMPLATE
+
+DEFAULT_MIX = {
+    "discover": 25, "swipe": 25, "matches": 10, "chat_history": 10,
+    "chat_send": 10, "routes": 12, "route_detail": 6, "register": 2,
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+
+    async def call(self, name, request):
+        started = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(elapsed)
+        return response.json()
+
+
+class VirtualRider:
+    def __init__(self, client, recorder, rng, rider_index, mix):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.email = EMAIL_TEMPLATE.format(rider_index)
+        self.actions = list(mix)
+        self.weights = list(mix.values())
+        self.headers = {}
+        self.candidates = []
+        self.match_ids = []
+        self.route_ids = []
+
+    async def login(self):
+        body = await self.recorder.call("login", self.client.post(
+            "/api/auth/login", json={"email": self.email, "password": BENCH_PASSWORD}
+        ))
+        if body is None:
+            raise RuntimeError(f"Login failed for {self.email}: is the database seeded?")
+        self.headers = {"Authorization": f"Bearer {body['access_token']}"}
+
+    async def step(self):
+        action = self.rng.choices(self.actions, weights=self.weights)[0]
+        await getattr(self, action)()
+
+    async def register(self):
+        await self.recorder.call("register", self.client.post("/api/auth/register", json={
+            "email": f"load-{uuid.uuid4().hex}@bench.gravelmatch.it", "password": BENCH_PASSWORD, "name": "Load"
+        }))
+
+    async def discover(self):
+        users = await self.recorder.call("discover", self.client.get("/api/discover", headers=self.headers))
+        self.candidates = [u["id"] for u in users or []]
+
+    async def swipe(self):
+        if not self.candidates:
+            await self.discover()
+            if not self.candidates:
+                return
+        await self.recorder.call("swipe", self.client.post("/api/swipe", headers=self.headers, json={
+            "target_user_id": self.candidates.pop(), "action": "like" if self.rng.random() < 0.6 else "pass"
+        }))
+
+    async def matches(self):
+        matches = await self.recorder.call("matches", self.client.get("/api/matches", headers=self.headers))
+        self.match_ids = [m["id"] for m in matches or []]
+
+    async def chat_history(self):
+        if not self.match_ids:
+            return await self.matches()
+        await self.recorder.call("chat_history", self.client.get(
+            f"/api/chat/{self.rng.choice(self.match_ids)}", headers=self.headers
+        ))
+
+    async def chat_send(self):
+        if not self.match_ids:
+            return await self.matches()
+        await self.recorder.call("chat_send", self.client.post("/api/chat", headers=self.headers, json={
+            "match_id": self.rng.choice(self.match_ids), "content": "Giro domenica mattina?"
+        }))
+
+    async def routes(self):
+        routes = await self.recorder.call("routes", self.client.get("/api/routes", params={"limit": 20}))
+        self.route_ids = [r["id"] for r in routes or []]
+
+    async def route_detail(self):
+        if not self.route_ids:
+            return await self.routes()
+        await self.recorder.call("route_detail", self.client.get(f"/api/routes/{self.rng.choice(self.route_ids)}"))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown"
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    mix = dict(DEFAULT_MIX)
+    for item in args.mix or []:
+        name, weight = item.split("=")
+        mix[name] = int(weight)
+
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        riders = [
+            VirtualRider(client, recorder, random.Random(rng.random()), rng.randrange(args.users), mix)
+            for _ in range(args.clients)
+        ]
+        await asyncio.gather(*(rider.login() for rider in riders))
+
+        deadline = time.perf_counter() + args.duration
+
+        async def loop(rider):
+            while time.perf_counter() < deadline:
+                await rider.step()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(loop(rider) for rider in riders))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        latencies = recorder.latencies[name]
+        endpoints[name] = {
+            **summarize(latencies),
+            "rps": round(len(latencies) / elapsed, 2),
+            "errors": recorder.errors[name],
+        }
+    total = [value for name, values in recorder.latencies.items() if name != "login" for value in values]
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "base_url": args.base_url,
+            "clients": args.clients,
+            "duration_s": round(elapsed, 2),
+            "mix": mix,
+        },
+        "endpoints": endpoints,
+        "total": {**summarize(total), "rps": round(len(total) / elapsed, 2)},
+    }
+
+
+def print_report(report: dict):
+    print(f"{'endpoint':<14} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for name, stats in [*report["endpoints"].items(), ("TOTAL", report["total"])]:
+        print(f"{name:<14} {stats['rps']:>9.1f} {stats['p50_ms']:>8.1f}ms {stats['p95_ms']:>8.1f}ms "
+              f"{stats['p99_ms']:>8.1f}ms {stats.get('errors', 0):>7}")
+
+
+def compare(baseline_path: str, current_path: str, threshold: float) -> int:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+
+    print(f"{baseline['meta']['revision']} -> {current['meta']['revision']} (regression threshold {threshold:.0f}%)")
+    regressions = 0
+    for name, stats in current["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if not base:
+            continue
+        cells = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            delta = (stats[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+            worse = delta < -threshold if key == "rps" else delta > threshold
+            regressions += worse and key in ("rps", "p95_ms")
+            cells.append(f"{key} {base[key]:.1f}->{stats[key]:.1f} ({delta:+.1f}%){' !' if worse else ''}")
+        print(f"  {name:<14} " + "  ".join(cells))
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run")
+    run_parser.add_argument("--base-url", default="http://localhost:8001")
+    run_parser.add_argument("--users", type=int, default=10000, help="number of seeded riders")
+    run_parser.add_argument("--clients", type=int, default=50)
+    run_parser.add_argument("--duration", type=float, default=60.0)
+    run_parser.add_argument("--timeout", type=float, default=30.0)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--mix", nargs="*", help="override weights, e.g. swipe=50 register=0")
+    run_parser.add_argument("--json")
+    compare_parser = sub.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="percent")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        sys.exit(compare(args.baseline, args.current, args.threshold))
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
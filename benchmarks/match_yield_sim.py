@@ -0,0 +1,106 @@
+"""Match yield of discovery with and without the pending-admirer boost.
+
+    python benchmarks/match_yield_sim.py [--riders 2000] [--sessions 10] [--slots 5]
+
+In-memory simulation, no database: synthetic riders (see seed.py) open
+discovery pages ranked with the backend's compatibility score and swipe every
+card. A rider likes a card with a probability that grows with compatibility.
+Both strategies replay the same riders and random draws; the boosted one puts
+up to --slots pending admirers at the top of each page, as /api/discover does.
+Reports matches per 1000 swipes and discover pages served per match.
+"""
+import argparse
+import random
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+from common import BACKEND_DIR
+from seed import generate_users
+
+sys.path.insert(0, BACKEND_DIR)
+import scoring  # noqa: E402
+
+PAGE_SIZE = 20
+
+
+def like_probabilities(riders: list, now: datetime) -> tuple:
+    """P(rider i likes rider j): logistic in compatibility, scaled by how picky i is"""
+    features = scoring.CandidateFeatures.from_documents(riders)
+    compatibility = np.vstack([scoring.score(rider, features, now=now) for rider in riders])
+    pickiness = np.random.default_rng(0).uniform(0.3, 1.0, len(riders))[:, None]
+    probabilities = pickiness / (1 + np.exp(-(compatibility - 0.6) * 12))
+    np.fill_diagonal(probabilities, 0)
+    return compatibility, probabilities
+
+
+def simulate(compatibility, probabilities, sessions: int, slots: int, seed: int) -> dict:
+    n = len(compatibility)
+    rng = np.random.default_rng(seed)
+    # One uniform draw per (swiper, target), shared by both strategies
+    draws = rng.random((n, n))
+    order = [rng.permutation(n) for _ in range(sessions)]
+
+    swiped = np.eye(n, dtype=bool)
+    liked = np.zeros((n, n), dtype=bool)
+    admirers = [[] for _ in range(n)]
+    swipes = matches = pages = 0
+
+    for session in order:
+        for rider in session:
+            page = []
+            if slots:
+                pending = [a for a in admirers[rider] if not swiped[rider, a]]
+                page = sorted(pending, key=lambda a: -compatibility[rider, a])[:slots]
+            scores = np.where(swiped[rider], -np.inf, compatibility[rider])
+            if page:
+                scores[page] = -np.inf
+            fill = scoring.top_k(scores, PAGE_SIZE - len(page))
+            page += [int(i) for i in fill if np.isfinite(scores[i])]
+            if not page:
+                continue
+            pages += 1
+
+            for target in page:
+                swipes += 1
+                swiped[rider, target] = True
+                if target in admirers[rider]:
+                    admirers[rider].remove(target)
+                if draws[rider, target] < probabilities[rider, target]:
+                    liked[rider, target] = True
+                    if liked[target, rider]:
+                        matches += 1
+                    else:
+                        admirers[target].append(rider)
+
+    return {
+        "swipes": swipes,
+        "matches": matches,
+        "pages": pages,
+        "matches_per_1000_swipes": round(matches / swipes * 1000, 1) if swipes else 0.0,
+        "pages_per_match": round(pages / matches, 1) if matches else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--riders", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=10, help="discover pages opened per rider")
+    parser.add_argument("--slots", type=int, default=5, help="DISCOVER_ADMIRER_SLOTS of the boosted run")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    riders = list(generate_users(random.Random(args.seed), args.riders, "", now))
+    compatibility, probabilities = like_probabilities(riders, now)
+
+    print(f"{args.riders} riders, {args.sessions} sessions each")
+    for name, slots in (("ranked", 0), (f"boosted ({args.slots} slots)", args.slots)):
+        result = simulate(compatibility, probabilities, args.sessions, slots, args.seed)
+        print(f"  {name:<20} {result['swipes']:>8} swipes  {result['matches']:>6} matches  "
+              f"{result['matches_per_1000_swipes']:>6.1f}/1000 swipes  {result['pages_per_match']} pages/match")
+
+
+if __name__ == "__main__":
+    main()
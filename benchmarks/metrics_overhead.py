@@ -0,0 +1,72 @@
+"""Throughput cost of the Prometheus instrumentation.
+
+Starts the backend alternately with METRICS_ENABLED=true/false and drives the same
+endpoint with concurrent clients, reporting requests/s and the relative overhead.
+
+    python benchmarks/seed.py --db gravelmatch_bench --users 10000 --drop
+    DB_NAME=gravelmatch_bench python benchmarks/metrics_overhead.py [--rounds 3] [--duration 10]
+        [--concurrency 32] [--path /api/routes?limit=20] [--token <jwt>]
+
+The default path is a Mongo-backed listing, read from the database in the
+environment (MONGO_URL, DB_NAME). /metrics and /api/health/live are not
+instrumented, so measuring them shows no cost.
+"""
+import argparse
+import asyncio
+import statistics
+
+import httpx
+
+from common import drive, free_port, start_server, stop_server, summarize, wait_until_ready, write_report
+
+
+async def measure(enabled: bool, args) -> float:
+    port = free_port()
+    proc = start_server(port, env={"METRICS_ENABLED": "true" if enabled else "false", "WARMUP_STEPS": ""})
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url)
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else None
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            await drive(client, args.path, args.concurrency, 1.0, headers)  # warm connections
+            latencies = await drive(client, args.path, args.concurrency, args.duration, headers)
+        return len(latencies) / args.duration, summarize(latencies)
+    finally:
+        stop_server(proc)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--path", default="/api/routes?limit=20")
+    parser.add_argument("--token")
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    results = {True: [], False: []}
+    # Alternate runs so drift on the host affects both variants equally
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            rps, latency = await measure(enabled, args)
+            results[enabled].append(rps)
+            print(f"metrics={'on ' if enabled else 'off'}  {rps:8.0f} req/s  p99 {latency['p99_ms']:.2f} ms")
+
+    baseline = statistics.median(results[False])
+    instrumented = statistics.median(results[True])
+    overhead = (baseline - instrumented) / baseline * 100
+    print(f"Median throughput: off {baseline:.0f} req/s, on {instrumented:.0f} req/s -> overhead {overhead:.2f}%")
+
+    if args.json:
+        write_report(args.json, {
+            "path": args.path,
+            "rps_disabled": results[False],
+            "rps_enabled": results[True],
+            "overhead_percent": round(overhead, 2),
+        })
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
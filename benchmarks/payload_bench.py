@@ -0,0 +1,70 @@
+"""Response size and latency with sparse fieldsets and compression.
+
+    python benchmarks/seed.py --db gravelmatch_bench --users 10000 --drop
+    cd backend && DB_NAME=gravelmatch_bench uvicorn server:app --port 8001
+    python benchmarks/payload_bench.py --base-url http://localhost:8001 --requests 50
+
+Logs in as a seeded rider and requests discover, routes, matches and
+notifications with and without `fields=` and with identity / gzip / br
+encodings, reporting bytes on the wire and p50/p95 latency per variant.
+"""
+import argparse
+import time
+
+import httpx
+
+from common import summarize, write_report
+from seed import BENCH_PASSWORD, EMAIL_TEMPLATE
+
+ENDPOINTS = {
+    "discover": ("/api/discover", {}, "name,profile_picture,age,experience_level,distance_km,compatibility"),
+    "routes": ("/api/routes", {"limit": 100}, "title,distance,elevation,difficulty,tags,likes"),
+    "matches": ("/api/matches", {}, "user.name,user.profile_picture,last_message"),
+    "notifications": ("/api/notifications", {"limit": 100}, "type,title,read,created_at"),
+}
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def measure(client, path: str, params: dict, encoding: str, requests: int) -> dict:
+    latencies, sizes = [], []
+    for _ in range(requests):
+        started = time.perf_counter()
+        with client.stream("GET", path, params=params, headers={"Accept-Encoding": encoding}) as response:
+            response.raise_for_status()
+            size = sum(len(chunk) for chunk in response.iter_raw())
+        latencies.append((time.perf_counter() - started) * 1000)
+        sizes.append(size)
+    return {**summarize(latencies), "bytes": round(sum(sizes) / len(sizes))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--rider", type=int, default=0, help="seeded rider index")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.base_url, timeout=30) as client:
+        token = client.post("/api/auth/login", json={
+            "email": EMAIL_TEMPLATE.format(args.rider), "password": BENCH_PASSWORD
+        }).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        report = {}
+        print(f"{'endpoint':<14} {'fields':<7} {'encoding':<9} {'bytes':>9} {'p50':>9} {'p95':>9}")
+        for name, (path, params, fields) in ENDPOINTS.items():
+            for sparse in (False, True):
+                for encoding in ENCODINGS:
+                    query = {**params, "fields": fields} if sparse else params
+                    result = measure(client, path, query, encoding, args.requests)
+                    report[f"{name}/{'sparse' if sparse else 'full'}/{encoding}"] = result
+                    print(f"{name:<14} {'sparse' if sparse else 'full':<7} {encoding:<9} {result['bytes']:>9} "
+                          f"{result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms")
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Latency of well-behaved riders while one client floods the write endpoints.
+
+    python benchmarks/seed.py --db gravelmatch_bench --users 10000 --drop
+    cd backend && DB_NAME=gravelmatch_bench RATE_LIMIT_ENABLED=false uvicorn server:app --port 8001
+    python benchmarks/ratelimit_load.py --base-url http://localhost:8001 --json results/unlimited.json
+    # restart with RATE_LIMIT_ENABLED=true (the default) and run again
+
+Polite riders swipe and browse discover at a human pace (`--rate` requests
+per second each). After a baseline phase a single abusive rider starts
+swiping as fast as `--abuser-concurrency` connections allow. Reports the
+polite riders' p50/p95/p99 per phase, and how many of the abuser's requests
+were served and how many were rejected with 429.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+import httpx
+
+from common import summarize, write_report
+from seed import BENCH_PASSWORD, EMAIL_TEMPLATE
+
+
+async def login(client, rider_index: int) -> dict:
+    response = await client.post("/api/auth/login", json={
+        "email": EMAIL_TEMPLATE.format(rider_index), "password": BENCH_PASSWORD
+    })
+    if response.status_code != 200:
+        raise RuntimeError(f"Login failed for rider {rider_index}: is the database seeded?")
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def polite(client, headers: dict, rng, rate: float, deadline: float, latencies: list, statuses: Counter):
+    candidates = []
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        if candidates:
+            response = await client.post("/api/swipe", headers=headers, json={
+                "target_user_id": candidates.pop(), "action": "pass"
+            })
+        else:
+            response = await client.get("/api/discover", headers=headers, params={"fields": "id"})
+            if response.status_code == 200:
+                candidates = [u["id"] for u in response.json()]
+                rng.shuffle(candidates)
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses[response.status_code] += 1
+        await asyncio.sleep(max(0.0, 1 / rate - (time.perf_counter() - started)))
+
+
+async def abuser(client, headers: dict, targets: list, deadline: float, statuses: Counter):
+    while time.perf_counter() < deadline:
+        response = await client.post("/api/swipe", headers=headers, json={
+            "target_user_id": random.choice(targets), "action": "like"
+        })
+        statuses[response.status_code] += 1
+
+
+async def phase(client, riders: list, args, flood: bool, abuser_headers: dict, targets: list) -> dict:
+    deadline = time.perf_counter() + args.duration
+    latencies, polite_statuses, abuser_statuses = [], Counter(), Counter()
+    tasks = [
+        polite(client, headers, random.Random(i), args.rate, deadline, latencies, polite_statuses)
+        for i, headers in enumerate(riders)
+    ]
+    if flood:
+        tasks += [abuser(client, abuser_headers, targets, deadline, abuser_statuses)
+                  for _ in range(args.abuser_concurrency)]
+    await asyncio.gather(*tasks)
+    return {
+        "polite": {**summarize(latencies), "statuses": dict(polite_statuses)},
+        "abuser": {
+            "served": sum(n for code, n in abuser_statuses.items() if code < 400),
+            "rejected": abuser_statuses.get(429, 0),
+            "rps": round(sum(abuser_statuses.values()) / args.duration, 1),
+        } if flood else None,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--users", type=int, default=10000, help="seeded riders to draw from")
+    parser.add_argument("--riders", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=1.0)
+    parser.add_argument("--abuser-concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    indexes = rng.sample(range(args.users), args.riders + 1)
+    limits = httpx.Limits(max_connections=args.riders + args.abuser_concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        abuser_headers, *riders = await asyncio.gather(*(login(client, i) for i in indexes))
+        response = await client.get("/api/discover", headers=abuser_headers, params={"fields": "id"})
+        targets = [u["id"] for u in response.json()]
+
+        report = {"riders": args.riders, "rate": args.rate, "abuser_concurrency": args.abuser_concurrency}
+        for name, flood in (("baseline", False), ("flood", True)):
+            r = report[name] = await phase(client, riders, args, flood, abuser_headers, targets)
+            line = (f"{name:<9} polite p50 {r['polite']['p50_ms']:7.1f} ms  p95 {r['polite']['p95_ms']:7.1f} ms  "
+                    f"p99 {r['polite']['p99_ms']:7.1f} ms  statuses {r['polite']['statuses']}")
+            if r["abuser"]:
+                line += (f"  | abuser {r['abuser']['rps']} req/s, {r['abuser']['served']} served, "
+                         f"{r['abuser']['rejected']} rejected")
+            print(line)
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
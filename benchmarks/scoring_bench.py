@@ -0,0 +1,85 @@
+"""Discovery scoring throughput.
+
+    python benchmarks/scoring_bench.py [--candidates 100000] [--repeat 20] [--budget-ms 50]
+
+Times the vectorized scoring + top-k selection over synthetic feature columns,
+and separately the conversion of Mongo documents into columns.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+import scoring  # noqa: E402
+
+ZONES = np.array(["Toscana", "Lombardia", "Veneto", "Lazio", "Piemonte", "Sicilia"], dtype=object)
+
+
+def synthetic_features(n: int, rng: np.random.Generator) -> scoring.CandidateFeatures:
+    now = datetime.now(timezone.utc).timestamp()
+    return scoring.CandidateFeatures(
+        ids=list(range(n)),
+        age=rng.integers(18, 66, n).astype(float),
+        avg_distance=rng.choice([30.0, 60.0, 100.0, 150.0], n),
+        level=rng.integers(0, 3, n).astype(float),
+        zone=rng.choice(ZONES, n),
+        last_active=now - rng.uniform(0, 90 * 86400, n),
+        lat=rng.uniform(37.0, 46.5, n),
+        lng=rng.uniform(7.0, 18.0, n),
+    )
+
+
+def synthetic_documents(n: int, rng: np.random.Generator) -> list:
+    now = datetime.now(timezone.utc)
+    levels = list(scoring.LEVEL_ORDINALS)
+    return [{
+        "_id": i,
+        "age": int(rng.integers(18, 66)),
+        "avg_distance": 60,
+        "experience_level": levels[i % 3],
+        "preferred_zone": ZONES[i % len(ZONES)],
+        "last_active_at": now - timedelta(days=i % 90),
+        "geo": {"type": "Point", "coordinates": [float(rng.uniform(7.0, 18.0)), float(rng.uniform(37.0, 46.5))]},
+    } for i in range(n)]
+
+
+def timed(fn, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=100000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    user = {"age": 35, "avg_distance": 60, "experience_level": "intermediate", "preferred_zone": "Toscana",
+            "geo": {"type": "Point", "coordinates": [11.1, 43.35]}}
+    features = synthetic_features(args.candidates, rng)
+
+    scoring_ms = timed(lambda: scoring.top_k(scoring.score(user, features, scoring.DEFAULT_WEIGHTS), args.k), args.repeat)
+    docs = synthetic_documents(args.candidates, rng)
+    loading_ms = timed(lambda: scoring.CandidateFeatures.from_documents(docs), max(1, args.repeat // 4))
+
+    median = statistics.median(scoring_ms)
+    print(f"Score + top-{args.k} of {args.candidates} candidates: median {median:.2f} ms, "
+          f"max {max(scoring_ms):.2f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"Documents -> feature columns: median {statistics.median(loading_ms):.2f} ms")
+    sys.exit(0 if median <= args.budget_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
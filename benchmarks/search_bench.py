@@ -0,0 +1,90 @@
+"""Route search on a seeded database (see seed.py).
+
+    python benchmarks/seed.py --users 100000 --routes 1000000 --drop
+    python benchmarks/search_bench.py --queries 200
+
+Times the queries behind GET /api/routes/search for random words of the seeded
+vocabulary: the text-indexed page, the tag facet aggregation (uncached and
+through the facet cache), and a case-insensitive regex scan as the baseline a
+search without the text index would need.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+from pymongo import MongoClient
+
+from common import BACKEND_DIR, summarize, write_report
+from seed import ROUTE_WORDS, TAGS, ZONES
+
+sys.path.insert(0, BACKEND_DIR)
+import search  # noqa: E402
+
+PAGE = 20
+
+
+def timed(samples: dict, name: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="gravelmatch_bench")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    routes = MongoClient(args.mongo_url)[args.db]["routes"]
+    routes.create_index(search.TEXT_INDEX, **search.TEXT_INDEX_OPTIONS)
+    routes.create_index("tags")
+    total = routes.estimated_document_count()
+
+    rng = random.Random(args.seed)
+    vocabulary = ROUTE_WORDS + list(ZONES)
+    cache = search.FacetCache(ttl=3600)
+    relevance = {"$meta": "textScore"}
+    samples = {}
+    for _ in range(args.queries):
+        words = " ".join(rng.sample(vocabulary, rng.randint(1, 2)))
+        tags = rng.sample(TAGS, 1) if rng.random() < 0.5 else None
+        query = search.build_query(words, tags)
+
+        timed(samples, "text_page", lambda: list(
+            routes.find(query, {"score": relevance}).sort([("score", relevance), ("likes", -1)]).limit(PAGE)
+        ))
+        timed(samples, "facets", lambda: list(routes.aggregate(search.facet_pipeline(query))))
+        cache.get(routes, query)
+        timed(samples, "facets_cached", lambda: cache.get(routes, query))
+
+        pattern = re.compile("|".join(map(re.escape, words.split())), re.IGNORECASE)
+        scan = {"$or": [{"title": pattern}, {"description": pattern}]}
+        if tags:
+            scan["tags"] = {"$all": tags}
+        timed(samples, "regex_scan", lambda: list(routes.find(scan).limit(PAGE)))
+
+    stats = routes.find(query, {"score": relevance}).sort([("score", relevance)]).limit(PAGE).explain()["executionStats"]
+    report = {
+        "routes": total,
+        "queries": args.queries,
+        "results": {name: summarize(values) for name, values in samples.items()},
+        "text_plan": {"keys_examined": stats["totalKeysExamined"], "docs_examined": stats["totalDocsExamined"]},
+    }
+    print(f"{total} routes, {args.queries} queries")
+    for name, r in report["results"].items():
+        print(f"  {name:<14} p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms")
+    print(f"  text plan: {report['text_plan']['keys_examined']} keys, {report['text_plan']['docs_examined']} docs examined")
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Seed a MongoDB database with a synthetic GravelMatch dataset.
+
+    python benchmarks/seed.py --db gravelmatch_bench --users 10000 --drop
+    python benchmarks/seed.py --users 1000000 --routes 200000 --swipes 5000000 \\
+        --matches 300000 --messages 3000000
+
+The generated content (not the ObjectIds) is deterministic for a given --seed.
+Every seeded user can log in as rider<N>@bench.gravelmatch.it with password
+BENCH_PASSWORD, which is what benchmarks/load.py relies on. Start the backend against the same database so
+the warm-up step creates the indexes.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from passlib.context import CryptContext
+from pymongo import MongoClient
+
+from common import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+import fingerprints  # noqa: E402
+import geo  # noqa: E402
+import tracks  # noqa: E402
+
+BENCH_PASSWORD = "bench-password"
+EMAIL_TEMPLATE = "rider{}@bench.gravelmatch.it"
+
+FIRST_NAMES = ["Marco", "Giulia", "Luca", "Francesca", "Matteo", "Sara", "Andrea", "Chiara",
+               "Davide", "Elena", "Simone", "Martina", "Alessandro", "Silvia", "Paolo", "Irene"]
+LEVELS = ["beginner", "intermediate", "expert"]
+DISTANCES = [30, 60, 100, 150]
+DIFFICULTIES = ["easy", "moderate", "hard", "extreme"]
+TAGS = ["Panoramico", "Tecnico", "Forest", "Colline", "Pianura", "Sterrato", "Single Track"]
+# Zones offered by the profile setup, with their gazetteer centre
+ZONES = {
+    name: geo.GAZETTEER[geo.normalize(name)]
+    for name in ["Toscana", "Lombardia", "Veneto", "Emilia-Romagna", "Piemonte",
+                 "Lazio", "Trentino", "Sardegna", "Sicilia"]
+}
+ROUTE_WORDS = ["Anello", "Giro", "Traversata", "Strade Bianche", "Sterrati", "Colline", "Crinale", "Valle"]
+PHRASES = ["Ciao! Usciamo sabato?", "Che giro fai di solito?", "Conosci gli sterrati vicino a casa mia?",
+           "Partenza alle 8?", "Porto io le camere d'aria", "Ottimo giro ieri!", "Domenica piove, rimandiamo?"]
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def random_date(rng, now, days):
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def generate_users(rng, count, password_hash, now):
+    zones = list(ZONES)
+    for i in range(count):
+        zone = rng.choice(zones)
+        lat, lng = ZONES[zone]
+        created_at = random_date(rng, now, 365)
+        yield {
+            "_id": ObjectId(),
+            "email": EMAIL_TEMPLATE.format(i),
+            "password": password_hash,
+            "name": f"{rng.choice(FIRST_NAMES)} {i}",
+            "bio": "Gravel, caffè e sterrati.",
+            "experience_level": rng.choice(LEVELS),
+            "avg_distance": rng.choice(DISTANCES),
+            "preferred_zone": zone,
+            "zone_key": geo.normalize(zone),
+            "location": zone,
+            "geo": geo.point(lat + rng.uniform(-0.6, 0.6), lng + rng.uniform(-0.6, 0.6)),
+            "geo_source": "coordinates",
+            "age": rng.randint(18, 65),
+            "profile_completed": True,
+            "created_at": created_at,
+            "last_active_at": min(now, created_at + timedelta(days=rng.randint(0, 60))),
+        }
+
+
+def generate_routes(rng, count, users, now, duplicate_rate=0.0):
+    originals = []
+    for _ in range(count):
+        owner = rng.choice(users)
+        zone = rng.choice(list(ZONES))
+        duplicate_of = None
+        if originals and rng.random() < duplicate_rate:
+            # Re-upload of a popular loop: same track, GPS noise, maybe reversed
+            duplicate_of, source = rng.choice(originals)
+            waypoints = [
+                {**w, "lat": round(w["lat"] + rng.uniform(-0.0003, 0.0003), 6),
+                 "lng": round(w["lng"] + rng.uniform(-0.0003, 0.0003), 6)}
+                for w in (source[::-1] if rng.random() < 0.5 else source)
+            ]
+        else:
+            lat, lng = ZONES[zone]
+            lat += rng.uniform(-0.5, 0.5)
+            lng += rng.uniform(-0.5, 0.5)
+            waypoints = []
+            for _ in range(rng.randint(5, 40)):
+                lat += rng.uniform(-0.01, 0.01)
+                lng += rng.uniform(-0.01, 0.01)
+                waypoints.append({"lat": round(lat, 6), "lng": round(lng, 6), "ele": rng.randint(50, 1200)})
+        track = tracks.Track.from_waypoints(waypoints)
+        route_id = ObjectId()
+        if duplicate_of is None:
+            # Bounded pool of loops that later routes may duplicate
+            originals.append((route_id, waypoints))
+            if len(originals) > 1000:
+                originals.pop(rng.randrange(len(originals)))
+        yield {
+            "_id": route_id,
+            "title": f"{rng.choice(ROUTE_WORDS)} {zone} {rng.randint(1, 999)}",
+            "description": f"Percorso gravel in {zone}, fondo misto e panorami.",
+            "distance": round(rng.uniform(15, 200), 1),
+            "elevation": rng.randint(100, 3500),
+            "difficulty": rng.choice(DIFFICULTIES),
+            "start_point": {"name": zone, "lat": waypoints[0]["lat"], "lng": waypoints[0]["lng"]},
+            "end_point": None,
+            "waypoints": waypoints,
+            "stats": tracks.compute(track),
+            "fingerprint": fingerprints.compute(track.lat, track.lng),
+            "duplicate_of": duplicate_of,
+            "image_url": None,
+            "tags": rng.sample(TAGS, rng.randint(1, 3)),
+            "user_id": owner["_id"],
+            "user_name": owner["name"],
+            "likes": rng.randint(0, 200),
+            "created_at": random_date(rng, now, 365),
+        }
+
+
+def generate_matches(rng, count, users, now):
+    count = min(count, len(users) * (len(users) - 1) // 2)
+    seen = set()
+    while len(seen) < count:
+        a, b = rng.sample(users, 2)
+        pair = tuple(sorted((a["_id"], b["_id"])))
+        if pair in seen:
+            continue
+        seen.add(pair)
+        yield {"_id": ObjectId(), "users": [a["_id"], b["_id"]], "created_at": random_date(rng, now, 180)}
+
+
+def generate_swipes(rng, count, users, matches, now):
+    # Both sides of every match liked each other
+    for match in matches:
+        for user_id, target_id in (match["users"], match["users"][::-1]):
+            yield {"user_id": user_id, "target_user_id": target_id, "action": "like", "created_at": match["created_at"]}
+    for _ in range(max(0, count - 2 * len(matches))):
+        a, b = rng.sample(users, 2)
+        yield {
+            "user_id": a["_id"],
+            "target_user_id": b["_id"],
+            "action": "like" if rng.random() < 0.6 else "pass",
+            "created_at": random_date(rng, now, 180),
+        }
+
+
+def generate_messages(rng, count, matches, now):
+    if not matches:
+        return
+    # Skewed: a few long conversations, many short ones
+    weights = [1 / (rank + 1) for rank in range(len(matches))]
+    for match in rng.choices(matches, weights=weights, k=count):
+        yield {
+            "match_id": match["_id"],
+            "sender_id": rng.choice(match["users"]),
+            "content": rng.choice(PHRASES),
+            "created_at": min(now, match["created_at"] + timedelta(seconds=rng.randint(60, 180 * 86400))),
+        }
+
+
+def generate_notifications(rng, count, users, now):
+    for _ in range(count):
+        user = rng.choice(users)
+        yield {
+            "user_id": user["_id"],
+            "type": rng.choice(["match", "message"]),
+            "title": "Nuovo Match!",
+            "body": "Tu e un rider vi siete piaciuti!",
+            "data": {},
+            "read": rng.random() < 0.7,
+            "created_at": random_date(rng, now, 90),
+        }
+
+
+def insert(collection, documents, batch_size):
+    started = time.perf_counter()
+    total = 0
+    for batch in batched(documents, batch_size):
+        collection.insert_many(batch, ordered=False)
+        total += len(batch)
+    print(f"  {collection.name:<15} {total:>10} docs in {time.perf_counter() - started:6.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="gravelmatch_bench")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--routes", type=int, default=None, help="default: users / 5")
+    parser.add_argument("--swipes", type=int, default=None, help="default: users * 5")
+    parser.add_argument("--matches", type=int, default=None, help="default: users / 4")
+    parser.add_argument("--messages", type=int, default=None, help="default: matches * 10")
+    parser.add_argument("--notifications", type=int, default=None, help="default: users * 2")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="share of routes re-uploading an earlier loop")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--drop", action="store_true", help="drop the database first")
+    args = parser.parse_args()
+
+    routes = args.routes if args.routes is not None else args.users // 5
+    matches = args.matches if args.matches is not None else args.users // 4
+    swipes = args.swipes if args.swipes is not None else args.users * 5
+    messages = args.messages if args.messages is not None else matches * 10
+    notifications = args.notifications if args.notifications is not None else args.users * 2
+
+    client = MongoClient(args.mongo_url)
+    if args.drop:
+        client.drop_database(args.db)
+    db = client[args.db]
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+
+    print(f"Seeding {args.db}: {args.users} users, {routes} routes, {swipes} swipes, "
+          f"{matches} matches, {messages} messages, {notifications} notifications")
+
+    # bcrypt is deliberately slow: hash once and share it across all riders
+    password_hash = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(BENCH_PASSWORD)
+    users = list(generate_users(rng, args.users, password_hash, now))
+    insert(db["users"], users, args.batch_size)
+    match_docs = list(generate_matches(rng, matches, users, now))
+    insert(db["matches"], match_docs, args.batch_size)
+    insert(db["swipes"], generate_swipes(rng, swipes, users, match_docs, now), args.batch_size)
+    insert(db["messages"], generate_messages(rng, messages, match_docs, now), args.batch_size)
+    insert(db["routes"], generate_routes(rng, routes, users, now, args.duplicate_rate), args.batch_size)
+    insert(db["notifications"], generate_notifications(rng, notifications, users, now), args.batch_size)
+
+    db["bench_meta"].replace_one({"_id": "seed"}, {
+        "_id": "seed", "users": args.users, "routes": routes, "swipes": swipes, "matches": matches,
+        "messages": messages, "notifications": notifications, "seed": args.seed, "created_at": now
+    }, upsert=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Startup profiling for the backend.
+
+    python benchmarks/startup.py imports [--top 25] [--json out.json]
+        Import-time breakdown of `server` per top-level package (python -X importtime).
+
+    python benchmarks/startup.py cold-start [--runs 5] [--warmup-steps db,auth,llm]
+        Time from spawning uvicorn to the first successful request.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from common import BACKEND_DIR, free_port, start_server, stop_server, summarize, wait_until_ready, write_report
+
+
+def import_breakdown(top: int) -> dict:
+    env = {**os.environ, "DB_NAME": os.environ.get("DB_NAME", "gravelmatch")}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    per_package = defaultdict(int)
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        per_package[package] += int(self_us)
+        total_us += int(self_us)
+
+    ranked = sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in ranked},
+    }
+
+
+def cold_start(runs: int, warmup_steps: str) -> dict:
+    timings = []
+    for _ in range(runs):
+        port = free_port()
+        started = time.perf_counter()
+        proc = start_server(port, env={"WARMUP_STEPS": warmup_steps})
+        try:
+            wait_until_ready(f"http://127.0.0.1:{port}")
+            timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            stop_server(proc)
+    return {"warmup_steps": warmup_steps, **summarize(timings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    imports = sub.add_parser("imports")
+    imports.add_argument("--top", type=int, default=25)
+    imports.add_argument("--json")
+    cold = sub.add_parser("cold-start")
+    cold.add_argument("--runs", type=int, default=5)
+    cold.add_argument("--warmup-steps", default=os.environ.get("WARMUP_STEPS", "db,indexes,auth,llm"))
+    cold.add_argument("--json")
+    args = parser.parse_args()
+
+    if args.command == "imports":
+        report = import_breakdown(args.top)
+        print(f"Total import time: {report['total_ms']} ms")
+        for name, ms in report["packages_ms"].items():
+            print(f"  {name:<30} {ms:>8} ms")
+    else:
+        report = cold_start(args.runs, args.warmup_steps)
+        print(f"Cold start to first request ({args.runs} runs, warm-up: {args.warmup_steps or 'none'})")
+        print(f"  p50 {report['p50_ms']:.0f} ms, max {report['max_ms']:.0f} ms")
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Route analytics on long tracks.
+
+    python benchmarks/tracks_bench.py [--points 100000] [--repeat 20] [--budget-ms 100]
+
+Times tracks.summarize (waypoint dicts -> columns -> statistics, what
+create_route runs) and tracks.compute alone on a synthetic GPS track.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from common import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+import tracks  # noqa: E402
+
+
+def synthetic_waypoints(n: int, rng: np.random.Generator) -> list:
+    # ~5 m between points with a noisy, hilly elevation profile
+    lat = 43.3 + np.cumsum(rng.normal(0, 0.00004, n))
+    lng = 11.3 + np.cumsum(rng.normal(0, 0.00004, n))
+    ele = 300 + 200 * np.sin(np.linspace(0, 12 * np.pi, n)) + rng.normal(0, 2, n)
+    surfaces = np.array(["gravel", "asphalt", "dirt"])[(np.arange(n) // 2000) % 3]
+    return [
+        {"lat": float(a), "lng": float(b), "ele": float(e), "surface": str(s)}
+        for a, b, e, s in zip(lat, lng, ele, surfaces)
+    ]
+
+
+def timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="median budget for summarize")
+    args = parser.parse_args()
+
+    waypoints = synthetic_waypoints(args.points, np.random.default_rng(11))
+    track = tracks.Track.from_waypoints(waypoints)
+    stats = tracks.summarize(waypoints)
+    print(f"{args.points} points: {stats['distance_km']:.1f} km, +{stats['ascent_m']:.0f} m, "
+          f"max grade {stats['max_grade']}%, surfaces {stats['surfaces']}")
+
+    summarize_ms = timed(lambda: tracks.summarize(waypoints), args.repeat)
+    compute_ms = timed(lambda: tracks.compute(track), args.repeat)
+    for name, samples in (("summarize", summarize_ms), ("compute", compute_ms)):
+        print(f"  {name:<10} median {statistics.median(samples):7.2f} ms  max {max(samples):7.2f} ms")
+
+    if statistics.median(summarize_ms) > args.budget_ms:
+        print(f"Over budget ({args.budget_ms} ms)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
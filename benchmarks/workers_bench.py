@@ -0,0 +1,62 @@
+"""Throughput and latency against the number of gunicorn workers.
+
+    python benchmarks/seed.py --db gravelmatch_bench --users 10000 --drop
+    DB_NAME=gravelmatch_bench python benchmarks/workers_bench.py --workers 1,2,4 --duration 20
+
+Starts the backend with `gunicorn -c gunicorn.conf.py` once per worker
+count and drives the same endpoint with concurrent clients, reporting
+requests/s, p50/p99 latency and the speed-up over one worker. The database
+settings (MONGO_URL, DB_NAME, MONGO_READ_PREFERENCE, ...) are taken from
+the environment; pass --path/--token to measure another endpoint.
+"""
+import argparse
+import asyncio
+import sys
+
+import httpx
+
+from common import drive, free_port, start_server, stop_server, summarize, wait_until_ready, write_report
+
+
+async def measure(workers: int, args) -> dict:
+    port = free_port()
+    proc = start_server(port, env={"WEB_CONCURRENCY": str(workers), "PORT": str(port), "WARMUP_STEPS": args.warmup},
+                        args=[sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "server:app"])
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url)
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else None
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            await drive(client, args.path, args.concurrency, 2.0, headers)  # warm connections and workers
+            latencies = await drive(client, args.path, args.concurrency, args.duration, headers)
+        return {"rps": round(len(latencies) / args.duration, 1), **summarize(latencies)}
+    finally:
+        stop_server(proc)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--path", default="/api/routes?limit=20")
+    parser.add_argument("--token")
+    parser.add_argument("--warmup", default="db,indexes")
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    report = {"path": args.path, "concurrency": args.concurrency, "workers": {}}
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        r = report["workers"][workers] = await measure(workers, args)
+        baseline = baseline or r["rps"]
+        print(f"{workers:>3} workers  {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.2f} ms  p99 {r['p99_ms']:7.2f} ms  "
+              f"x{r['rps'] / baseline:.2f}")
+
+    if args.json:
+        write_report(args.json, report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
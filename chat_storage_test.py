@@ -0,0 +1,178 @@
+import argparse
+import os
+import random
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+sys.path.insert(0, BACKEND_DIR)
+import chat  # noqa: E402
+
+BUCKET_SIZE = 7
+
+class ChatStorageTester:
+    """Checks that the bucket store answers exactly like the document store.
+
+    Runs against a disposable database, which is dropped first:
+
+        python chat_storage_test.py mongodb://localhost:27017 gravelmatch_chat_test
+    """
+
+    def __init__(self, mongo_url="mongodb://localhost:27017", db_name="gravelmatch_chat_test"):
+        self.mongo_url = mongo_url
+        self.db_name = db_name
+        self.client = MongoClient(mongo_url)
+        self.tests_run = 0
+        self.tests_passed = 0
+        self.failed_tests = []
+        self.rng = random.Random(7)
+
+    def log_test(self, name, success, details=""):
+        self.tests_run += 1
+        if success:
+            self.tests_passed += 1
+            print(f"✅ {name} {details}")
+        else:
+            print(f"❌ {name} - {details}")
+            self.failed_tests.append({"test": name, "error": details})
+
+    def fresh_stores(self):
+        self.client.drop_database(self.db_name)
+        db = self.client[self.db_name]
+        documents = chat.make_store(db, "documents")
+        buckets = chat.make_store(db, "buckets", BUCKET_SIZE)
+        documents.ensure_indexes()
+        buckets.ensure_indexes()
+        return documents, buckets
+
+    def conversations(self):
+        """Messages of a few matches, interleaved in time; lengths around bucket boundaries"""
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        lengths = [1, BUCKET_SIZE - 1, BUCKET_SIZE, BUCKET_SIZE + 1, 3 * BUCKET_SIZE + 2]
+        slots = [match_id for match_id, n in ((ObjectId(), n) for n in lengths) for _ in range(n)]
+        self.rng.shuffle(slots)
+        senders = [ObjectId(), ObjectId()]
+        return [{
+            "_id": ObjectId(),
+            "match_id": match_id,
+            "sender_id": self.rng.choice(senders),
+            "content": f"messaggio {i}",
+            "created_at": start + timedelta(minutes=i),
+        } for i, match_id in enumerate(slots)]
+
+    @staticmethod
+    def normalized(messages):
+        return [(m["_id"], m["match_id"], m["sender_id"], m["content"], chat.naive_utc(m["created_at"]))
+                for m in messages]
+
+    def compare(self, name, documents, buckets, match_ids):
+        mismatches = []
+        for match_id in match_ids:
+            reads = [("page", lambda s: s.page(match_id))]
+            everything = documents.page(match_id)
+            for limit in (1, 3, BUCKET_SIZE, BUCKET_SIZE + 2, 100):
+                reads.append((f"page limit={limit}", lambda s, limit=limit: s.page(match_id, limit)))
+                for cut in everything[1::5]:
+                    reads.append((f"page limit={limit} before", lambda s, limit=limit, cut=cut:
+                                  s.page(match_id, limit, cut["created_at"])))
+            reads.append(("history", lambda s: list(s.history(match_id, 4))))
+            for label, read in reads:
+                if self.normalized(read(documents)) != self.normalized(read(buckets)):
+                    mismatches.append(f"{label} for {match_id}")
+        last_documents = documents.last_messages(match_ids)
+        last_buckets = buckets.last_messages(match_ids)
+        for match_id in match_ids:
+            if last_documents[match_id]["content"] != last_buckets[match_id]["content"]:
+                mismatches.append(f"last_messages for {match_id}")
+        self.log_test(name, not mismatches, "; ".join(mismatches[:5]))
+
+    def test_equivalence(self):
+        documents, buckets = self.fresh_stores()
+        messages = self.conversations()
+        for message in messages:
+            documents.append(dict(message))
+            buckets.append(dict(message))
+        self.compare("Buckets match documents", documents, buckets, list({m["match_id"] for m in messages}))
+
+    def test_concurrent_appends(self, threads=8, per_thread=25):
+        """Appends racing across threads must still fill one bucket at a time"""
+        _, buckets = self.fresh_stores()
+        match_id = ObjectId()
+
+        def worker(n):
+            for i in range(per_thread):
+                buckets.append({"match_id": match_id, "sender_id": ObjectId(), "content": f"{n}-{i}",
+                                "created_at": datetime.now(timezone.utc)})
+
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+
+        docs = list(buckets.collection.find({"match_id": match_id}).sort("seq", 1))
+        total = threads * per_thread
+        expected_counts = [BUCKET_SIZE] * (total // BUCKET_SIZE) + ([total % BUCKET_SIZE] if total % BUCKET_SIZE else [])
+        problems = []
+        if [d["seq"] for d in docs] != list(range(len(docs))):
+            problems.append(f"seqs {[d['seq'] for d in docs]}")
+        if [d["count"] for d in docs] != expected_counts:
+            problems.append(f"counts {[d['count'] for d in docs]}")
+        if sum(len(d["messages"]) for d in docs) != total:
+            problems.append("messages lost")
+        self.log_test("Concurrent appends roll over once", not problems, "; ".join(problems))
+
+    def test_migration(self):
+        documents, buckets = self.fresh_stores()
+        messages = self.conversations()
+        for message in messages:
+            documents.append(dict(message))
+
+        os.environ.update({"MONGO_URL": self.mongo_url, "DB_NAME": self.db_name})
+        os.environ.setdefault("SECRET_KEY", "chat-storage-test")
+        import manage
+        manage.migrate_messages(argparse.Namespace(bucket_size=BUCKET_SIZE, batch_size=3, drop=True))
+        match_ids = list({m["match_id"] for m in messages})
+        self.compare("Migrated buckets match documents", documents, buckets, match_ids)
+
+        # Appends after the migration continue the last bucket of each match
+        for match_id in match_ids:
+            message = {"_id": ObjectId(), "match_id": match_id, "sender_id": ObjectId(), "content": "dopo la migrazione",
+                       "created_at": datetime(2027, 1, 1, tzinfo=timezone.utc)}
+            documents.append(dict(message))
+            buckets.append(message)
+        self.compare("Appends after migration match documents", documents, buckets, match_ids)
+
+    def run(self):
+        self.test_equivalence()
+        self.test_concurrent_appends()
+        self.test_migration()
+        self.client.drop_database(self.db_name)
+
+def main():
+    mongo_url = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+    db_name = sys.argv[2] if len(sys.argv) > 2 else "gravelmatch_chat_test"
+    print(f"🔎 Checking chat storage engines against {mongo_url}/{db_name}")
+    print("=" * 50)
+
+    tester = ChatStorageTester(mongo_url, db_name)
+    try:
+        tester.run()
+    except Exception as e:
+        tester.log_test("Chat storage run", False, f"Exception: {str(e)}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {tester.tests_passed}/{tester.tests_run} passed")
+    if tester.failed_tests:
+        print("\n❌ Failed Tests:")
+        for failed in tester.failed_tests:
+            print(f"  - {failed['test']}: {failed['error']}")
+
+    return 0 if not tester.failed_tests else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
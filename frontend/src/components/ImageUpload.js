@@ -54,7 +54,7 @@ export const ImageUpload = ({
 
       if (response.data.success) {
         setPreview(response.data.url);
-        onUpload && onUpload(response.data.url);
+        onUpload && onUpload(response.data.url, response.data.variants);
         toast.success('Immagine caricata!');
       }
     } catch (error) {
@@ -21,6 +21,7 @@ export default function CreateRoute() {
     difficulty: 'moderate',
     start_point: { name: '', lat: null, lng: null },
     image_url: '',
+    image_variants: null,
     tags: []
   });
 
@@ -99,7 +100,7 @@ export default function CreateRoute() {
           <label className="text-sm text-zinc-400 mb-2 block">Foto del percorso</label>
           <ImageUpload
             currentImage={route.image_url}
-            onUpload={(url) => setRoute({ ...route, image_url: url })}
+            onUpload={(url, variants) => setRoute({ ...route, image_url: url, image_variants: variants || null })}
             folder="gravelmatch/routes"
             aspectRatio="video"
             placeholder="Carica una foto del percorso"
@@ -0,0 +1,151 @@
+import requests
+import sys
+import base64
+from datetime import datetime
+
+# 1x1 PNG for the upload endpoints
+TINY_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+class QueryBudgetTester:
+    """Checks every endpoint against its MongoDB query budget.
+
+    The backend must run with QUERY_TRACE=true (and ideally QUERY_BUDGET_ENFORCE=true)
+    against a disposable database, e.g.:
+
+        cd backend && QUERY_TRACE=true QUERY_BUDGET_ENFORCE=true uvicorn server:app --port 8001
+        python query_budget_test.py http://localhost:8001
+    """
+
+    def __init__(self, base_url="http://localhost:8001"):
+        self.base_url = base_url
+        self.tests_run = 0
+        self.tests_passed = 0
+        self.failed_tests = []
+        self.suffix = datetime.now().strftime('%H%M%S%f')
+
+    def log_test(self, name, success, details=""):
+        self.tests_run += 1
+        if success:
+            self.tests_passed += 1
+            print(f"✅ {name} {details}")
+        else:
+            print(f"❌ {name} - {details}")
+            self.failed_tests.append({"test": name, "error": details})
+
+    def check(self, name, method, endpoint, token=None, expected_status=(200,), **kwargs):
+        """Call an endpoint and assert the query count reported by the tracer is within budget"""
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        try:
+            response = requests.request(method, f"{self.base_url}/{endpoint}", headers=headers, timeout=60, **kwargs)
+        except Exception as e:
+            self.log_test(name, False, f"Request error: {str(e)}")
+            return None
+
+        count = response.headers.get('X-Query-Count')
+        budget = response.headers.get('X-Query-Budget')
+        if response.status_code == 500 and 'Query budget exceeded' in response.text:
+            self.log_test(name, False, response.json().get('detail'))
+        elif response.status_code not in expected_status:
+            self.log_test(name, False, f"Expected {expected_status}, got {response.status_code}")
+        elif count is None:
+            self.log_test(name, False, "Missing X-Query-Count header: is QUERY_TRACE=true?")
+        elif budget is None:
+            self.log_test(name, False, f"No query budget configured ({count} queries)")
+        elif int(count) > int(budget):
+            self.log_test(name, False, f"{count} queries > budget {budget}")
+        else:
+            self.log_test(name, True, f"({count}/{budget} queries)")
+
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    def register(self, name, **profile):
+        email = f"budget_{name}_{self.suffix}@test.com"
+        body = self.check(f"Register {name}", "POST", "api/auth/register",
+                          json={"email": email, "password": "TestPass123!", "name": name})
+        token = body["access_token"]
+        self.check(f"Update profile {name}", "PUT", "api/profile", token, json=profile)
+        user = self.check(f"Me {name}", "GET", "api/auth/me", token)
+        return token, user["id"], email
+
+    def run(self):
+        profile = {"experience_level": "intermediate", "avg_distance": 60, "preferred_zone": "Toscana", "age": 30}
+
+        self.check("Health", "GET", "api/health")
+        self.check("Liveness", "GET", "api/health/live")
+        self.check("Metrics", "GET", "metrics")
+
+        token_a, user_a, email_a = self.register("alice", **profile)
+        self.check("Login", "POST", "api/auth/login", json={"email": email_a, "password": "TestPass123!"})
+
+        # Several matches with messages, so per-row query patterns show up in the counts
+        others = [self.register(name, **profile) for name in ("bob", "carla", "dario")]
+        match_ids = []
+        for token, user_id, _ in others:
+            self.check("Swipe like (no match)", "POST", "api/swipe", token,
+                       json={"target_user_id": user_a, "action": "like"})
+            result = self.check("Swipe like (match)", "POST", "api/swipe", token_a,
+                                json={"target_user_id": user_id, "action": "like"})
+            match_ids.append(result["match_id"])
+        for match_id, (token, _, _) in zip(match_ids, others):
+            self.check("Send message", "POST", "api/chat", token_a, json={"match_id": match_id, "content": "Uscita sabato?"})
+            self.check("Reply message", "POST", "api/chat", token, json={"match_id": match_id, "content": "Volentieri!"})
+
+        self.check("Discover", "GET", "api/discover", token_a)
+        self.check("Discover with filters", "GET", "api/discover?min_age=20&max_age=40&zone=Toscana", token_a)
+        self.check("Matches", "GET", "api/matches", token_a)
+        self.check("Chat history", "GET", f"api/chat/{match_ids[0]}", token_a)
+
+        route = self.check("Create route", "POST", "api/routes", token_a, json={
+            "title": "Budget loop", "distance": 42.0, "difficulty": "medium",
+            "start_point": {"name": "Siena", "lat": 43.32, "lng": 11.33}, "tags": ["gravel"]
+        })
+        self.check("Routes", "GET", "api/routes?difficulty=medium&min_distance=10&max_distance=100")
+        self.check("Route search", "GET", "api/routes/search?q=loop&tags=gravel&difficulty=medium")
+        self.check("Route detail", "GET", f"api/routes/{route['id']}")
+        self.check("My routes", "GET", "api/routes/user/me", token_a)
+        self.check("Like route", "POST", f"api/routes/{route['id']}/like", token_a)
+
+        notifications = self.check("Notifications", "GET", "api/notifications", token_a)
+        self.check("Unread count", "GET", "api/notifications/unread-count", token_a)
+        if notifications:
+            self.check("Mark read", "PUT", f"api/notifications/{notifications[0]['id']}/read", token_a)
+        self.check("Mark all read", "PUT", "api/notifications/read-all", token_a)
+        self.check("Export", "GET", "api/export", token_a)
+
+        # Cloudinary/LLM may be unconfigured; only the query count matters here
+        self.check("Upload image", "POST", "api/upload/image", token_a, expected_status=(200, 500),
+                   files={"file": ("tiny.png", TINY_PNG, "image/png")})
+        self.check("Upload profile picture", "POST", "api/upload/profile-picture", token_a, expected_status=(200, 500),
+                   files={"file": ("tiny.png", TINY_PNG, "image/png")})
+        self.check("AI route suggestions", "GET", "api/ai/route-suggestions", token_a)
+        self.check("AI match tips", "GET", f"api/ai/match-tips?target_user_id={others[0][1]}", token_a)
+        # Admin only: 403 without X-Admin-Token, the budget still applies
+        self.check("AI match tips stats", "GET", "api/ai/match-tips/stats", expected_status=(200, 403))
+
+def main():
+    base_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8001"
+    print(f"🔎 Checking query budgets against {base_url}")
+    print("=" * 50)
+
+    tester = QueryBudgetTester(base_url)
+    try:
+        tester.run()
+    except Exception as e:
+        tester.log_test("Budget run", False, f"Exception: {str(e)}")
+
+    print("\n" + "=" * 50)
+    print(f"📊 Test Results: {tester.tests_passed}/{tester.tests_run} passed")
+    if tester.failed_tests:
+        print("\n❌ Failed Tests:")
+        for failed in tester.failed_tests:
+            print(f"  - {failed['test']}: {failed['error']}")
+
+    return 0 if not tester.failed_tests else 1
+
+if __name__ == "__main__":
+    sys.exit(main())